@@ -1,504 +1,999 @@
-import tkinter as tk
-from tkinter import messagebox
-from tkinter import ttk
-import sqlite3
-
-
-class SalonBookingSystem:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Salon Appointment Booking System")
-        self.root.geometry("900x650")
-        self.root.resizable(0, 0)
-
-        # Set the background color for the main window
-        self.root.config(bg="lightyellow")
-
-        # Database Initialization
-        self.db_connection = sqlite3.connect('salon_appointments.db')
-        self.db_cursor = self.db_connection.cursor()
-        self.create_tables()  # Create all required tables
-        
-        self.appointments = []
-        self.services_with_prices = self.fetch_services()
-        self.stylists = self.fetch_stylists()
-
-        self.create_welcome_screen()  # Start directly with the welcome screen
-        
-    def create_tables(self):
-        # Create appointments table
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                phone TEXT,
-                email TEXT,
-                service TEXT,
-                stylist TEXT,
-                date TEXT,
-                time TEXT
-            )
-        ''')
-
-        # Create services table
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS services (
-                service_name TEXT PRIMARY KEY,
-                price REAL
-            )
-        ''')
-        self.populate_services()
-
-        # Create stylists table
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS stylists (
-                name TEXT PRIMARY KEY,
-                experience TEXT,
-                specialty TEXT,
-                email TEXT
-            )
-        ''')
-        self.populate_stylists()
-
-        self.db_connection.commit()
-        
-    def populate_services(self):
-        # Insert default services and prices if the table is empty
-        self.db_cursor.execute("SELECT COUNT(*) FROM services")
-        if self.db_cursor.fetchone()[0] == 0:
-            default_services = [
-                ("Haircut", 80),
-                ("Manicure", 150),
-                ("Pedicure", 150),
-                ("Facial", 1500),
-                ("Massage", 500)
-            ]
-            self.db_cursor.executemany("INSERT INTO services (service_name, price) VALUES (?, ?)", default_services)
-
-    def populate_stylists(self):
-        # Insert default stylists if the table is empty
-        self.db_cursor.execute("SELECT COUNT(*) FROM stylists")
-        if self.db_cursor.fetchone()[0] == 0:
-            default_stylists = [
-                ("Anna Reyes", "6 years", "Haircuts, Color, Rebond", "anna@example.com"),
-                ("Jane Bien", "4 years", "Manicure, Pedicure, Nail Art", "jane@example.com"),
-                ("Emily Davis", "8 years", "Facial, Massage", "emily@example.com"),
-                ("Lara Hernandez", "4 years", "Haircuts, Color, Hair Treatment", "lara@example.com")
-            ]
-            self.db_cursor.executemany("INSERT INTO stylists (name, experience, specialty, email) VALUES (?, ?, ?, ?)", default_stylists)
-
-    def fetch_services(self):
-        # Retrieve services and prices from the database
-        self.db_cursor.execute("SELECT * FROM services")
-        return {row[0]: row[1] for row in self.db_cursor.fetchall()}
-
-    def fetch_stylists(self):
-        # Retrieve stylists from the database
-        self.db_cursor.execute("SELECT * FROM stylists")
-        return {
-            row[0]: {"experience": row[1], "specialty": row[2], "email": row[3]}
-            for row in self.db_cursor.fetchall()
-        }
-        self.db_connection.commit()
-        
-    def create_welcome_screen(self):
-        self.clear_screen()
-
-        # Welcome Label
-        tk.Label(self.root, text="Welcome to the Salon Appointment System", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
-
-        # Instructions Label
-        tk.Label(self.root, text="Please choose an option below:", font=("Times", 14), pady=10, bg="lightyellow").pack()
-
-        # Buttons
-        tk.Button(self.root, text="Book Appointment", command=self.show_login_screen, bg="lightblue", font=("Arial", 14), width=20, height=2).pack(pady=20)
-        tk.Button(self.root, text="Admin", command=self.show_admin_login_screen, bg="lightgreen", font=("Arial", 14), width=20, height=2).pack()
-    
-    def show_admin_login_screen(self):
-        self.clear_screen()
-
-        # Admin Login Frame
-        login_frame = tk.Frame(self.root, bg="lightyellow")
-        login_frame.pack(pady=70)
-
-        # Admin Login Title
-        tk.Label(self.root, text="Admin Login", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
-
-        # Instructions Label
-        tk.Label(self.root, text="Enter admin credentials to proceed:", font=("Times", 14), pady=10, bg="lightyellow").pack()
-
-        # Username Label and Entry
-        tk.Label(self.root, text="Username:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
-        self.admin_username_entry = tk.Entry(self.root, font=("Arial", 12))
-        self.admin_username_entry.pack(pady=5)
-
-        # Password Label and Entry
-        tk.Label(self.root, text="Password:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
-        self.admin_password_entry = tk.Entry(self.root, show="*", font=("Arial", 12))
-        self.admin_password_entry.pack(pady=5)
-
-        # Login Button
-        login_button = tk.Button(self.root, text="Login", command=self.admin_login, bg="lightblue", font=("Arial", 14), width=20, height=2)
-        login_button.pack(pady=20)
-
-    def admin_login(self):
-        admin_username = self.admin_username_entry.get()
-        admin_password = self.admin_password_entry.get()
-
-        # Hardcoded admin credentials for simplicity
-        if admin_username == "admin" and admin_password == "admin123":
-            self.admin_action()  # Proceed to the admin panel after successful login
-        else:
-            messagebox.showerror("Login Failed", "Invalid username or password")
-
-    def admin_action(self):
-        self.clear_screen()  # Clear the current screen
-
-        # Frame for Admin Panel
-        admin_frame = tk.Frame(self.root, bg="lightyellow")
-        admin_frame.pack(fill="both", expand=True, pady=20, padx=20)
-
-        # Label for Admin Panel
-        tk.Label(admin_frame, text="Admin Information Panel", font=("Times", 14, "bold"), bg="lightyellow").pack(pady=20)
-
-        # Buttons for different sections
-        button_frame = tk.Frame(admin_frame, bg="lightyellow")
-        button_frame.pack(side="top", pady=10)
-
-        tk.Button(button_frame, text="Customer Information", command=self.display_customer_info, bg="lightblue", width=30, height=2).pack(pady=10)
-        tk.Button(button_frame, text="Stylist Information", command=self.display_stylist_info, bg="lightgreen", width=30, height=2).pack(pady=10)
-        tk.Button(button_frame, text="Services and Prices", command=self.display_service_info, bg="lightpink", width=30, height=2).pack(pady=10)
-
-        # Treeview Frame for Displaying Data
-        treeview_frame = tk.Frame(admin_frame, bg="lightyellow")
-        treeview_frame.pack(side="top", fill="both", expand=True, pady=20, padx=20)
-
-        self.treeview = ttk.Treeview(treeview_frame, show="headings")
-        self.treeview.pack(side="top", fill="both", expand=True)
-
-        # Buttons for Update, Delete, and Exit actions
-        action_frame = tk.Frame(admin_frame, bg="lightyellow")  # Below the treeview
-        action_frame.pack(side="bottom", pady=10)
-
-        tk.Button(action_frame, text="Update", command=self.update_appointment, bg="lightblue", width=15, height=2).pack(side="left", padx=10)
-        tk.Button(action_frame, text="Delete", command=self.delete_appointment, bg="lightcoral", width=15, height=2).pack(side="left", padx=10)
-        tk.Button(action_frame, text="Exit", command=self.exit_admin_panel, bg="lightcoral", width=15, height=2).pack(side="right", padx=10)
-
-    def exit_admin_panel(self):
-        messagebox.showinfo("Thank You", "Thank you for using the Salon Appointment System!")
-        self.root.quit()  # Close the application
-
-    def display_customer_info(self):
-        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
-        self.treeview["columns"] = ("Name", "Phone", "Email", "Service", "Stylist", "Date", "Time")
-        
-        # Set column headings with alignment
-        for col in self.treeview["columns"]:
-            self.treeview.heading(col, text=col, anchor="center")
-            self.treeview.column(col, anchor="center", width=120)  # Adjust width as needed
-
-        # Fetch data from the database
-        self.db_cursor.execute("SELECT * FROM appointments")
-        appointments = self.db_cursor.fetchall()
-
-        # Insert data rows
-        for app in appointments:
-            self.treeview.insert("", tk.END, values=(app[1], app[2], app[3], app[4], app[5], app[6], app[7]))
-
-    def delete_appointment(self):
-        selected_item = self.treeview.selection()
-        if not selected_item:
-            messagebox.showerror("Error", "No appointment selected!")
-            return
-
-        for item in selected_item:
-            values = self.treeview.item(item, "values")
-            self.treeview.delete(item)
-
-            # Remove from database
-            self.db_cursor.execute("DELETE FROM appointments WHERE name = ? AND phone = ?", (values[0], values[1]))
-            self.db_connection.commit()
-
-        # Show success message after deletion
-        messagebox.showinfo("Success", "Appointment deleted successfully!")
-
-
-    def update_appointment(self):
-        selected_item = self.treeview.selection()
-        if not selected_item:
-            messagebox.showerror("Error", "No appointment selected!")
-            return
-
-        for item in selected_item:
-            values = self.treeview.item(item, "values")
-            selected_name = values[0]  # Use "Name" as the unique identifier
-
-        # Find the appointment in the database
-        self.db_cursor.execute("SELECT * FROM appointments WHERE name = ? AND phone = ?", (selected_name, values[1]))
-        appointment = self.db_cursor.fetchone()
-
-        if not appointment:
-            messagebox.showerror("Error", "Could not find the selected appointment!")
-            return
-
-        # Create a pop-up window for updating the appointment
-        update_window = tk.Toplevel(self.root)
-        update_window.title("Update Appointment")
-        update_window.geometry("400x400")
-        update_window.config(bg="lightyellow")
-
-        # Fields for editing
-        fields = {
-            "Name": "name",
-            "Phone": "phone",
-            "Email": "email",
-            "Service": "service",
-            "Stylist": "stylist",
-            "Date": "date",
-            "Time": "time"
-        }
-        entries = {}
-
-        # Labels and Entry widgets
-        for i, (label, key) in enumerate(fields.items()):
-            tk.Label(update_window, text=label, bg="lightyellow", font=("Arial", 12)).grid(row=i, column=0, padx=10, pady=5, sticky="w")
-            entry = tk.Entry(update_window, font=("Arial", 12), width=30)
-            entry.insert(0, appointment[i+1])  # Prefill with existing data
-            entry.grid(row=i, column=1, padx=10, pady=5, sticky="w")
-            entries[key] = entry
-
-        def save_changes():
-            # Save updated values back to the database
-            self.db_cursor.execute('''UPDATE appointments SET name = ?, phone = ?, email = ?, service = ?, stylist = ?, date = ?, time = ? 
-                                    WHERE id = ?''', 
-                                    (entries["name"].get(), entries["phone"].get(), entries["email"].get(), entries["service"].get(), 
-                                     entries["stylist"].get(), entries["date"].get(), entries["time"].get(), appointment[0]))
-            self.db_connection.commit()
-
-            # Refresh the Treeview to show updated data
-            self.display_customer_info()
-            messagebox.showinfo("Success", "Appointment updated successfully!")
-            update_window.destroy()
-
-        # Save button
-        tk.Button(update_window, text="Save Changes", command=save_changes, bg="lightgreen", font=("Arial", 12), width=20).grid(row=len(fields), column=0, columnspan=2, pady=20)
-        
-    def display_stylist_info(self):
-        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
-        self.treeview["columns"] = ("Stylist", "Experience", "Specialty", "Email")
-        
-        # Set column headings with alignment
-        for col in self.treeview["columns"]:
-            self.treeview.heading(col, text=col, anchor="center")
-            self.treeview.column(col, anchor="center", width=100)  # Adjust width as needed
-
-        # Insert data rows
-        for stylist, info in self.stylists.items():
-            self.treeview.insert("", tk.END, values=(stylist, info["experience"], info["specialty"], info["email"]))
-
-    def display_service_info(self):
-        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
-        self.treeview["columns"] = ("Service", "Price")
-        
-        # Set column headings with alignment
-        for col in self.treeview["columns"]:
-            self.treeview.heading(col, text=col, anchor="center")
-            self.treeview.column(col, anchor="center", width=100)  # Adjust width as needed
-
-        # Insert data rows
-        for service, price in self.services_with_prices.items():
-            self.treeview.insert("", tk.END, values=(service, price))
-
-    def show_login_screen(self):
-        self.clear_screen()
-        
-        # Frame for Login Screen
-        login_frame = tk.Frame(self.root, bg="lightyellow")
-        login_frame.pack(pady=70)
-
-        # Login Title
-        tk.Label(self.root, text="Login to Book Appointment", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
-
-        # Instructions Label
-        tk.Label(self.root, text="Enter username and password to proceed:", font=("Times", 14), pady=10, bg="lightyellow").pack()
-
-        # Username Label and Entry
-        tk.Label(self.root, text="Username:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
-        self.username_entry = tk.Entry(self.root, font=("Arial", 12))
-        self.username_entry.pack(pady=5)
-
-        # Password Label and Entry
-        tk.Label(self.root, text="Password:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
-        self.password_entry = tk.Entry(self.root, show="*", font=("Arial", 12))
-        self.password_entry.pack(pady=5)
-
-        # Login Button
-        login_button = tk.Button(self.root, text="Login", command=self.login, bg="lightblue", font=("Arial", 14), width=20, height=2)
-        login_button.pack(pady=20)
-
-    def login(self):
-        username = self.username_entry.get()
-        password = self.password_entry.get()
-
-        # Hardcoded credentials for simplicity
-        if username == "" and password == "":
-            self.create_booking_screen()  # Proceed to booking screen after successful login
-        else:
-            messagebox.showerror("Login Failed", "Invalid username or password")
-
-    def create_booking_screen(self):
-        self.clear_screen()
-
-        # Create a frame to hold the entire booking form
-        main_frame = tk.Frame(self.root, bg="lightblue")
-        main_frame.pack(padx=20, pady=20, fill='both', expand=True)
-
-        # Create a grid layout: 2 columns, with left and right frames
-        main_frame.grid_columnconfigure(0, weight=1, uniform="group1")
-        main_frame .grid_columnconfigure(1, weight=1, uniform="group1")
-
-        # Left Side Frame
-        left_frame = tk.Frame(main_frame, bg="lightblue")
-        left_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-
-        # Right Side Frame
-        right_frame = tk.Frame(main_frame, bg="lightblue")
-        right_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-        
-
-        # Title Label
-        tk.Label(left_frame, text="Salon Appointment Booking", font=("Times", 16, "bold"), pady=10, bg="lightblue").grid(row=0, column=0, columnspan=2, sticky="w")
-
-        # Customer Name
-        tk.Label(left_frame, text="Customer Name:", anchor="w", bg="lightblue").grid(row=1, column=0, pady=5, padx=10, sticky="w")
-        self.name_entry = tk.Entry(left_frame, width=30)
-        self.name_entry.grid(row=1, column=1, pady=5, padx=10, sticky="w")
-
-        # Customer Phone Number
-        tk.Label(left_frame, text="Phone Number:", anchor="w", bg="lightblue").grid(row=2, column=0, pady=5, padx=10, sticky="w")
-        self.phone_entry = tk.Entry(left_frame, width=30)
-        self.phone_entry.grid(row=2, column=1, pady=5, padx=10, sticky="w")
-
-        # Customer Email
-        tk.Label(left_frame, text="Email:", anchor="w", bg="lightblue").grid(row=3, column=0, pady=5, padx=10, sticky="w")
-        self.email_entry = tk.Entry(left_frame, width=30)
-        self.email_entry.grid(row=3, column=1, pady=5, padx=10, sticky="w")
-
-        # Service Options (on the left side)
-        tk.Label(left_frame, text="Service:", anchor="w", bg="lightblue").grid(row=4, column=0, pady=5, padx=10, sticky="w")
-        self.service_listbox = tk.Listbox(left_frame, height=5, width=30, selectmode=tk.SINGLE)
-        for service, price in self.services_with_prices.items():
-            self.service_listbox.insert(tk.END, f"{service} - ${price}")
-        self.service_listbox.grid(row=4, column=1, pady=5, padx=10, sticky="w")
-
-        # Stylist Selection
-        tk.Label(right_frame, text="Select Stylist:", anchor="w", bg="lightblue").grid(row=1, column=0, pady=5, padx=10, sticky="w")
-        self.stylist_var = tk.StringVar(value="STYLIST")
-        stylists = ["Anna Reyes", "Jane Bien", "Emily Davis", "Lara Hernandez"]
-        self.stylist_menu = tk.OptionMenu(right_frame, self.stylist_var, *stylists)
-        self.stylist_menu.grid(row=1, column=1, pady=5, padx=10, sticky="w")
-
-        # Date
-        tk.Label(right_frame, text="Date (YYYY-MM-DD):", anchor="w", bg="lightblue").grid(row=2, column=0, pady=5, padx=10, sticky="w")
-        self.date_entry = tk.Entry(right_frame, width=30)
-        self.date_entry.grid(row=2, column=1, pady=5, padx=10, sticky="w")
-
-        # Time
-        tk.Label(right_frame, text="Time:", anchor="w", bg="lightblue").grid(row=3, column=0, pady=5, padx=10, sticky="w")
-        self.time_var = tk.StringVar(value="TIME")
-        time_slots = [
-            "10:00", "11:00",
-            "01:00", "01:30",
-            "02:00", "03:00",
-            "04:00 - 4:30"
-        ]
-        self.time_menu = tk.OptionMenu(right_frame, self.time_var, *time_slots)
-        self.time_menu.grid(row=3, column=1, pady=5, padx=10, sticky="w")
-
-        # Payment Method Selection (on the right side)
-        tk.Label(right_frame, text="Payment Method:", anchor="w", bg="lightblue").grid(row=4, column=0, pady=5, padx=10, sticky="w")
-        self.payment_var = tk.StringVar(value="Payment Method")
-        payment_methods = ["Credit Card", "Cash", "Pay Pal"]
-        self.payment_menu = tk.OptionMenu(right_frame, self.payment_var, *payment_methods)
-        self.payment_menu.grid(row=4, column=1, pady=5, padx=10, sticky="w")
-        
-
-        # Receipt Box (Below Customer Details)
-        receipt_frame = tk.Frame(main_frame, bg="lightblue")
-        receipt_frame.grid(row=1, column=0, columnspan=2, pady=10, padx=10, sticky="nsew")
-
-        # Center the receipt within the frame
-        receipt_title_label = tk.Label(receipt_frame, text="Appointment Receipt", anchor="w", bg="lightblue", font=("Arial", 14, "bold"))
-        receipt_title_label.pack(anchor="w", padx=10, pady=5)
-
-        # Receipt Text Box
-        self.receipt_text = tk.Label(receipt_frame, text="Appointment Receipt details.", anchor="w", bg="lightyellow", font=("Times", 12), width=80, height=10)
-        self.receipt_text.pack(anchor="w", padx=10, pady=5)
-
-        # Back to Welcome Button (on the right side below the receipt)
-        back_button = tk.Button(receipt_frame, text="Exit", command=self.create_welcome_screen, bg="lightcoral", width=20)
-        back_button.pack(pady=10, padx=10, side="right")
-
-        # Submit Button (on the right side)
-        submit_button = tk.Button(right_frame, text="Book Appointment", command=self.book_appointment, bg="lightgreen", width=20)
-        submit_button.grid(row=6, column=0, columnspan=2, pady=10, padx=10)
-
-    def update_receipt_text(self, name, service, date, time, stylist, payment_method):
-    # Update the receipt box text with aligned formatting
-
-        receipt_details = (
-        f"\t{'Appointment Details:':<25}\n"
-        f"\t{'Name':<15}:      {name}\n"
-        f"\t{'Service':<15}:   {service}\n"
-        f"\t\t{'Date':<15} :     {date}\n"
-        f"\t{'Time':<16} :     {time}\n"
-        f"\t{'Stylist':<15}:   {stylist}\n"
-        f"\t{'Payment Method':<15}: {payment_method}"
-        )   
-        self.receipt_text.config(text=receipt_details)
-
-
-    def book_appointment(self):
-        name = self.name_entry.get()
-        phone = self.phone_entry.get()
-        email = self.email_entry.get()
-        service = self.service_listbox.get(tk.ACTIVE)
-        stylist = self.stylist_var.get()
-        date = self.date_entry.get()
-        time = self.time_var.get()
-        payment_method = self.payment_var.get()
-
-        if not name or not phone or not email or not service or not stylist or not date or not time or not payment_method:
-            messagebox.showerror("Error", "All fields are required!")
-            return
-
-        # Update the receipt with the entered data
-        self.update_receipt_text(name, service.split(" - ")[0], date, time, stylist, payment_method)
-        
-        # Insert the appointment data into the database
-        self.db_cursor.execute('''INSERT INTO appointments (name, phone, email, service, stylist, date, time) 
-                                VALUES (?, ?, ?, ?, ?, ?, ?)''', 
-                                (name, phone, email, service.split(" - ")[0], stylist, date, time))
-        self.db_connection.commit()
-
-        self.appointments.append({
-            "name":    name,
-            "phone":   phone,
-            "email":   email,
-            "service": service.split(" - ")[0],
-            "stylist": stylist,
-            "date":    date,
-            "time":    time
-        })
-
-        #messagebox.showinfo("Success", "Appointment booked successfully!")
-        #self.create_welcome_screen()  # Return to welcome screen after booking
-
-    def clear_screen(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
-
-# Create the main window and pass it to the SalonBookingSystem
-root = tk.Tk()
-app = SalonBookingSystem(root)
-root.mainloop()
\ No newline at end of file
+import tkinter as tk
+from tkinter import messagebox
+from tkinter import ttk
+
+import bisect
+from collections import deque
+from datetime import date as calendar_date, timedelta
+from functools import partial
+
+from salon_availability import TIME_SLOTS, parse_date
+from salon_engine import (MAX_SERIES_OCCURRENCES, PAGE_SIZE, REPORT_GROUPS, AppointmentNotFoundError, BookingEngine, SlotTakenError,
+                          listing_key)
+from salon_metrics import Metrics, profiled
+from salon_worker import DatabaseWorker
+
+# Pages of customer rows kept in the admin Treeview at once
+WINDOW_PAGES = 5
+
+# How often the Tk thread collects finished database requests, in milliseconds
+DB_POLL_MS = 20
+
+# How often the catalog cache checks whether another terminal changed services or stylists
+CATALOG_CHECK_MS = 2000
+
+# Days covered by the admin report when it opens
+REPORT_DAYS = 30
+
+# Days ahead searched by the booking screen's Soonest Available button
+SOONEST_DAYS = 30
+
+# Repeat choices of the booking screen, in weeks between appointments, and the default number of appointments
+REPEAT_CHOICES = {"Does not repeat": None, "Every 2 weeks": 2, "Every 3 weeks": 3, "Every 4 weeks": 4}
+REPEAT_COUNT = 6
+
+# How often the metrics file is rewritten while profiling
+METRICS_SAVE_MS = 60000
+
+
+class SalonBookingSystem:
+    def __init__(self, root, engine_factory=BookingEngine, metrics=None):
+        self.root = root
+        self.metrics = metrics  # salon_metrics.Metrics when started with SALON_METRICS, else None
+        self.root.title("Salon Appointment Booking System")
+        self.root.geometry("900x650")
+        self.root.resizable(0, 0)
+
+        # Set the background color for the main window
+        self.root.config(bg="lightyellow")
+
+        # Screens are built on first visit and stacked in one grid cell; navigation raises them
+        self.screens = {}
+        self.current_screen = None
+        self.root.grid_rowconfigure(0, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
+
+        # Database Initialization: all queries run on a worker thread with its own connection
+        self.db = DatabaseWorker(engine_factory, on_error=self.show_database_error)
+        self.db.start_engine()
+        self.view_generation = 0
+        self.poll_database()
+
+        self.appointments = []
+        self.catalog = self.db.engine.catalog  # Services and stylists, read by every screen
+        self.catalog_view = None
+        self.drawn_catalog = {}  # Widget -> catalog table it was last filled from
+        self.root.after(CATALOG_CHECK_MS, self.check_catalog)
+        if self.metrics is not None:
+            self.root.after(METRICS_SAVE_MS, self.save_metrics)
+
+        self.create_welcome_screen()  # Start directly with the welcome screen
+
+    def poll_database(self):
+        # Deliver finished database results on the Tk thread
+        self.db.dispatch_responses()
+        self.root.after(DB_POLL_MS, self.poll_database)
+
+    def save_metrics(self):
+        self.metrics.save()
+        self.root.after(METRICS_SAVE_MS, self.save_metrics)
+
+    def show_database_error(self, error):
+        messagebox.showerror("Database Error", str(error))
+
+    def check_catalog(self):
+        self.db.submit("refresh_catalog", callback=self.catalog_changed, errback=lambda error: None)
+        self.root.after(CATALOG_CHECK_MS, self.check_catalog)
+
+    def catalog_changed(self, changed=None):
+        # Redraw only what shows a catalog table the cache has replaced since it was drawn. Tables are
+        # replaced, never mutated, so this also catches reloads triggered by engine calls.
+        if "booking" in self.screens:
+            if self.drawn_catalog.get("service_listbox") is not self.catalog.services:
+                self.fill_service_listbox()
+            if self.drawn_catalog.get("stylist_menu") is not self.catalog.stylists:
+                self.fill_stylist_menu()
+        if self.catalog_view == "services" and self.drawn_catalog.get("treeview") is not self.catalog.services:
+            self.display_service_info()
+        if self.catalog_view == "stylists" and self.drawn_catalog.get("treeview") is not self.catalog.stylists:
+            self.display_stylist_info()
+
+    def for_current_view(self, callback):
+        # Drop results that arrive after the user has moved to another view
+        generation = self.view_generation
+
+        def deliver(result):
+            if generation == self.view_generation:
+                callback(result)
+        return deliver
+
+    @profiled("screen: create_welcome_screen")
+    def create_welcome_screen(self):
+        self.show_screen("welcome", self.build_welcome_screen)
+
+    def build_welcome_screen(self, screen):
+        # Welcome Label
+        tk.Label(screen, text="Welcome to the Salon Appointment System", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
+
+        # Instructions Label
+        tk.Label(screen, text="Please choose an option below:", font=("Times", 14), pady=10, bg="lightyellow").pack()
+
+        # Buttons
+        tk.Button(screen, text="Book Appointment", command=self.show_login_screen, bg="lightblue", font=("Arial", 14), width=20, height=2).pack(pady=20)
+        tk.Button(screen, text="Admin", command=self.show_admin_login_screen, bg="lightgreen", font=("Arial", 14), width=20, height=2).pack()
+    
+    @profiled("screen: show_admin_login_screen")
+    def show_admin_login_screen(self):
+        self.show_screen("admin_login", self.build_admin_login_screen, self.reset_admin_login_screen)
+
+    def build_admin_login_screen(self, screen):
+        # Admin Login Frame
+        login_frame = tk.Frame(screen, bg="lightyellow")
+        login_frame.pack(pady=70)
+
+        # Admin Login Title
+        tk.Label(screen, text="Admin Login", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
+
+        # Instructions Label
+        tk.Label(screen, text="Enter admin credentials to proceed:", font=("Times", 14), pady=10, bg="lightyellow").pack()
+
+        # Username Label and Entry
+        tk.Label(screen, text="Username:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
+        self.admin_username_entry = tk.Entry(screen, font=("Arial", 12))
+        self.admin_username_entry.pack(pady=5)
+
+        # Password Label and Entry
+        tk.Label(screen, text="Password:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
+        self.admin_password_entry = tk.Entry(screen, show="*", font=("Arial", 12))
+        self.admin_password_entry.pack(pady=5)
+
+        # Login Button
+        login_button = tk.Button(screen, text="Login", command=self.admin_login, bg="lightblue", font=("Arial", 14), width=20, height=2)
+        login_button.pack(pady=20)
+
+    def reset_admin_login_screen(self):
+        self.admin_username_entry.delete(0, tk.END)
+        self.admin_password_entry.delete(0, tk.END)
+        self.admin_username_entry.focus_set()
+
+    def admin_login(self):
+        admin_username = self.admin_username_entry.get()
+        admin_password = self.admin_password_entry.get()
+
+        # Hardcoded admin credentials for simplicity
+        if admin_username == "admin" and admin_password == "admin123":
+            self.admin_action()  # Proceed to the admin panel after successful login
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password")
+
+    @profiled("screen: admin_action")
+    def admin_action(self):
+        self.show_screen("admin", self.build_admin_panel, self.reset_admin_panel)
+
+    def build_admin_panel(self, screen):
+        # Frame for Admin Panel
+        admin_frame = tk.Frame(screen, bg="lightyellow")
+        admin_frame.pack(fill="both", expand=True, pady=20, padx=20)
+
+        # Label for Admin Panel
+        tk.Label(admin_frame, text="Admin Information Panel", font=("Times", 14, "bold"), bg="lightyellow").pack(pady=20)
+
+        # Buttons for different sections
+        button_frame = tk.Frame(admin_frame, bg="lightyellow")
+        button_frame.pack(side="top", pady=10)
+
+        tk.Button(button_frame, text="Customer Information", command=self.display_customer_info, bg="lightblue", width=30, height=2).pack(pady=10)
+        tk.Button(button_frame, text="Stylist Information", command=self.display_stylist_info, bg="lightgreen", width=30, height=2).pack(pady=10)
+        tk.Button(button_frame, text="Services and Prices", command=self.display_service_info, bg="lightpink", width=30, height=2).pack(pady=10)
+
+        # Customer search by name, phone or email
+        search_frame = tk.Frame(admin_frame, bg="lightyellow")
+        search_frame.pack(side="top", pady=5)
+
+        tk.Label(search_frame, text="Search Customer:", font=("Arial", 12), bg="lightyellow").pack(side="left", padx=5)
+        self.search_entry = tk.Entry(search_frame, font=("Arial", 12), width=30)
+        self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<Return>", lambda event: self.search_customers())
+        tk.Button(search_frame, text="Search", command=self.search_customers, bg="lightblue", width=10).pack(side="left", padx=5)
+        # Listing and search can reach into the archive of old appointments; archived rows are read-only
+        self.include_archive_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Include archive", variable=self.include_archive_var, bg="lightyellow").pack(side="left", padx=5)
+
+        # Revenue and utilization reports, served from the summary tables
+        report_frame = tk.Frame(admin_frame, bg="lightyellow")
+        report_frame.pack(side="top", pady=5)
+
+        tk.Label(report_frame, text="Report by:", font=("Arial", 12), bg="lightyellow").pack(side="left", padx=5)
+        self.report_group_var = tk.StringVar(value="stylist")
+        tk.OptionMenu(report_frame, self.report_group_var, *REPORT_GROUPS).pack(side="left", padx=5)
+        tk.Label(report_frame, text="From:", font=("Arial", 12), bg="lightyellow").pack(side="left", padx=5)
+        self.report_from_entry = tk.Entry(report_frame, font=("Arial", 12), width=12)
+        self.report_from_entry.pack(side="left", padx=5)
+        tk.Label(report_frame, text="To:", font=("Arial", 12), bg="lightyellow").pack(side="left", padx=5)
+        self.report_to_entry = tk.Entry(report_frame, font=("Arial", 12), width=12)
+        self.report_to_entry.pack(side="left", padx=5)
+        tk.Button(report_frame, text="Show Report", command=self.display_report, bg="lightgreen", width=12).pack(side="left", padx=5)
+
+        # Treeview Frame for Displaying Data
+        treeview_frame = tk.Frame(admin_frame, bg="lightyellow")
+        treeview_frame.pack(side="top", fill="both", expand=True, pady=20, padx=20)
+
+        self.treeview = ttk.Treeview(treeview_frame, show="headings")
+        self.treeview_scrollbar = ttk.Scrollbar(treeview_frame, orient="vertical", command=self.treeview.yview)
+        self.treeview.configure(yscrollcommand=self.on_treeview_scroll)
+        self.treeview_scrollbar.pack(side="right", fill="y")
+        self.treeview.pack(side="top", fill="both", expand=True)
+
+        # Buttons for Update, Delete, and Exit actions
+        action_frame = tk.Frame(admin_frame, bg="lightyellow")  # Below the treeview
+        action_frame.pack(side="bottom", pady=10)
+
+        tk.Button(action_frame, text="Update", command=self.update_appointment, bg="lightblue", width=15, height=2).pack(side="left", padx=10)
+        tk.Button(action_frame, text="Delete", command=self.delete_appointment, bg="lightcoral", width=15, height=2).pack(side="left", padx=10)
+        if self.metrics is not None:
+            tk.Button(action_frame, text="Diagnostics", command=self.display_diagnostics, bg="lightgrey", width=15, height=2).pack(side="left", padx=10)
+        tk.Button(action_frame, text="Exit", command=self.exit_admin_panel, bg="lightcoral", width=15, height=2).pack(side="right", padx=10)
+
+    def reset_admin_panel(self):
+        # Back to an empty table and the default search and report settings
+        self.treeview.delete(*self.treeview.get_children())
+        self.treeview["columns"] = ()
+        self.search_entry.delete(0, tk.END)
+        self.include_archive_var.set(False)
+        today = calendar_date.today()
+        self.report_group_var.set("stylist")
+        self.report_from_entry.delete(0, tk.END)
+        self.report_from_entry.insert(0, (today - timedelta(days=REPORT_DAYS - 1)).isoformat())
+        self.report_to_entry.delete(0, tk.END)
+        self.report_to_entry.insert(0, today.isoformat())
+
+    def exit_admin_panel(self):
+        messagebox.showinfo("Thank You", "Thank you for using the Salon Appointment System!")
+        self.root.quit()  # Close the application
+
+    @profiled("screen: display_customer_info")
+    def display_customer_info(self):
+        self.show_appointment_pages("list_appointments_page", ())
+
+    @profiled("screen: search_customers")
+    def search_customers(self):
+        # Prefix search over name, phone and email through the FTS index, paged like the full list
+        text = self.search_entry.get().strip()
+        if not text:
+            self.display_customer_info()
+            return
+        self.show_appointment_pages("search_appointments", (text,))
+
+    def show_appointment_pages(self, page_method, page_args):
+        # page_method(*page_args, after, before, **page_options) is the engine call that pages this view
+        self.page_method = page_method
+        self.page_args = page_args
+        self.page_options = {"include_archive": self.include_archive_var.get()}
+        self.view_generation += 1
+        self.showing_appointments = False
+        self.catalog_view = None
+        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
+        self.treeview["columns"] = ("Name", "Phone", "Email", "Service", "Stylist", "Date", "Time")
+        
+        # Set column headings with alignment
+        for col in self.treeview["columns"]:
+            self.treeview.heading(col, text=col, anchor="center")
+            self.treeview.column(col, anchor="center", width=120)  # Adjust width as needed
+
+        # Fetch the first page; later pages are loaded as the user scrolls
+        self.db.submit(self.page_method, *self.page_args, callback=self.for_current_view(self.show_first_page), **self.page_options)
+
+    def show_first_page(self, appointments):
+        self.customer_pages = deque()  # row_key() of every row, page by page, currently in the Treeview
+        self.page_pending = False
+        self.more_before = False
+        self.more_after = len(appointments) == PAGE_SIZE
+        if appointments:
+            self.customer_pages.append(self.insert_appointment_rows(appointments, tk.END))
+        self.showing_appointments = True
+
+    def insert_appointment_rows(self, appointments, index):
+        # Insert data rows, keyed by the appointment id so admin actions can address the exact row
+        for offset, app in enumerate(appointments):
+            position = index if index == tk.END else index + offset
+            self.treeview.insert("", position, iid=str(app[0]), values=(app[1], app[2], app[3], app[4], app[5], app[6], app[7]))
+        return [self.row_key(app) for app in appointments]
+
+    def row_key(self, app):
+        # Sort key of a row in the current view; the appointment id is always last
+        if self.page_method == "search_appointments":
+            return (app[0],)
+        return listing_key(app)
+
+    def on_treeview_scroll(self, first, last):
+        self.treeview_scrollbar.set(first, last)
+
+        # Near either edge of the loaded window, fetch the neighbouring page once Tk is idle
+        if not self.showing_appointments or self.page_pending:
+            return
+        if not self.customer_pages:
+            return
+        if float(last) > 0.9 and self.more_after:
+            self.page_pending = True
+            self.db.submit(self.page_method, *self.page_args, self.customer_pages[-1][-1],
+                           callback=self.for_current_view(self.show_next_page), errback=self.page_failed, **self.page_options)
+        elif float(first) < 0.1 and self.more_before:
+            self.page_pending = True
+            self.db.submit(self.page_method, *self.page_args, None, self.customer_pages[0][0],
+                           callback=self.for_current_view(self.show_previous_page), errback=self.page_failed, **self.page_options)
+
+    def page_failed(self, error):
+        self.page_pending = False
+        self.show_database_error(error)
+
+    def show_next_page(self, appointments):
+        self.page_pending = False
+        self.more_after = len(appointments) == PAGE_SIZE
+        if not appointments:
+            return
+
+        top = self.first_visible_index()
+        self.customer_pages.append(self.insert_appointment_rows(appointments, tk.END))
+        if len(self.customer_pages) > WINDOW_PAGES:
+            # Keep memory bounded by dropping the page furthest from the view
+            dropped = self.customer_pages.popleft()
+            self.delete_rows([str(key[-1]) for key in dropped])
+            self.more_before = True
+            self.scroll_to_index(top - len(dropped))
+
+    def show_previous_page(self, appointments):
+        self.page_pending = False
+        self.more_before = len(appointments) == PAGE_SIZE
+        if not appointments:
+            return
+
+        top = self.first_visible_index()
+        self.customer_pages.appendleft(self.insert_appointment_rows(appointments, 0))
+        if len(self.customer_pages) > WINDOW_PAGES:
+            dropped = self.customer_pages.pop()
+            self.delete_rows([str(key[-1]) for key in dropped])
+            self.more_after = True
+        self.scroll_to_index(top + len(appointments))
+
+    def refresh_appointment_row(self, appointment_id):
+        # Re-read a single appointment and patch its Treeview row in place
+        if not self.showing_appointments:
+            return
+        self.db.submit("get_appointment", appointment_id,
+                       callback=self.for_current_view(lambda app: self.apply_appointment_row(appointment_id, app)))
+
+    def apply_appointment_row(self, appointment_id, app):
+        self.forget_row_key(appointment_id)
+        if app is None:
+            self.delete_rows([str(appointment_id)])
+        else:
+            self.place_appointment_row(app)
+
+    def place_appointment_row(self, app):
+        # Put one row at its (date, id) position inside the loaded window; rows that now sort outside
+        # the window are dropped and will come back with the page they belong to
+        iid, key = str(app[0]), self.row_key(app)
+        if self.page_method == "search_appointments" and not self.treeview.exists(iid):
+            return  # New bookings are not checked against the search terms
+        keys = [k for page in self.customer_pages for k in page]
+        if (self.more_before and keys and key < keys[0]) or (self.more_after and keys and key > keys[-1]):
+            self.delete_rows([iid])
+            return
+
+        if not self.customer_pages:
+            self.customer_pages.append([])
+        page = next((page for page in self.customer_pages if page and key <= page[-1]), self.customer_pages[-1])
+        bisect.insort(page, key)
+        index = bisect.bisect_left(keys, key)
+        values = (app[1], app[2], app[3], app[4], app[5], app[6], app[7])
+        if self.treeview.exists(iid):
+            self.treeview.item(iid, values=values)
+            self.treeview.move(iid, "", index)
+        else:
+            self.treeview.insert("", index, iid=iid, values=values)
+
+    def forget_row_key(self, appointment_id):
+        for page in self.customer_pages:
+            page[:] = [key for key in page if key[-1] != appointment_id]
+        # Empty pages would leave no border key to paginate from
+        for page in [page for page in self.customer_pages if not page]:
+            self.customer_pages.remove(page)
+
+    def first_visible_index(self):
+        total = len(self.treeview.get_children())
+        return round(float(self.treeview.yview()[0]) * total)
+
+    def scroll_to_index(self, index):
+        total = len(self.treeview.get_children())
+        if total:
+            self.treeview.yview_moveto(max(index, 0) / total)
+
+    def delete_rows(self, iids):
+        # Rows may already be gone after an admin delete
+        self.treeview.delete(*[iid for iid in iids if self.treeview.exists(iid)])
+
+    def delete_appointment(self):
+        selected_item = self.treeview.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "No appointment selected!")
+            return
+
+        if not self.showing_appointments:
+            messagebox.showerror("Error", "Open Customer Information to select an appointment!")
+            return
+
+        # Remove from database, then drop just those rows from the Treeview
+        appointment_ids = [int(item) for item in selected_item]
+        if len(appointment_ids) == 1:
+            self.db.submit("series_of", appointment_ids[0], callback=self.for_current_view(
+                lambda series: self.confirm_series_delete(appointment_ids[0], series)))
+            return
+        self.db.submit("delete_appointments", appointment_ids,
+                       callback=self.delete_callback(appointment_ids))
+
+    def confirm_series_delete(self, appointment_id, series):
+        # A booking made as part of a series can take the later ones in the series with it
+        if series is None or series[2] < 2:
+            self.db.submit("delete_appointments", [appointment_id],
+                           callback=self.delete_callback([appointment_id]))
+            return
+        answer = messagebox.askyesnocancel("Delete Series", f"This appointment was booked together with {series[2] - 1} others.\n\n"
+                                           "Yes deletes it and every later one in the series, No deletes only this one.")
+        if answer is None:
+            return
+        if answer:
+            date = self.treeview.item(str(appointment_id), "values")[5]
+            self.db.submit("cancel_series", series[0], date, callback=self.for_current_view(self.appointments_deleted))
+        else:
+            self.db.submit("delete_appointments", [appointment_id],
+                           callback=self.delete_callback([appointment_id]))
+
+    def delete_callback(self, appointment_ids):
+        # Callback for delete_appointments: only the rows it deleted leave the Treeview, the rest are archived
+        # or were deleted by another station
+        def deleted(removed):
+            if removed:
+                self.appointments_deleted(removed)
+            kept = len(appointment_ids) - len(removed)
+            if kept and self.page_options["include_archive"]:
+                messagebox.showerror("Error", f"{kept} of the selected appointments could not be deleted! Archived appointments cannot be deleted.")
+            elif kept:
+                messagebox.showerror("Error", f"{kept} of the selected appointments no longer exist!")
+        return self.for_current_view(deleted)
+
+    def appointments_deleted(self, appointment_ids):
+        for appointment_id in appointment_ids:
+            self.apply_appointment_row(appointment_id, None)
+
+        # Show success message after deletion
+        messagebox.showinfo("Success", "Appointment deleted successfully!")
+
+
+    def update_appointment(self):
+        selected_item = self.treeview.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "No appointment selected!")
+            return
+
+        if not self.showing_appointments:
+            messagebox.showerror("Error", "Open Customer Information to select an appointment!")
+            return
+
+        # The Treeview item id is the appointment id
+        appointment_id = int(selected_item[-1])
+
+        def open_window(appointment):
+            self.db.submit("series_of", appointment_id, callback=lambda series: self.open_update_window(appointment, series))
+        self.db.submit("get_appointment", appointment_id, callback=open_window)
+
+    def open_update_window(self, appointment, series=None):
+        if not appointment:
+            messagebox.showerror("Error", "Could not find the selected appointment! Archived appointments cannot be changed.")
+            return
+
+        # Create a pop-up window for updating the appointment
+        update_window = tk.Toplevel(self.root)
+        update_window.title("Update Appointment")
+        update_window.geometry("400x440")
+        update_window.config(bg="lightyellow")
+
+        # Fields for editing
+        fields = {
+            "Name": "name",
+            "Phone": "phone",
+            "Email": "email",
+            "Service": "service",
+            "Stylist": "stylist",
+            "Date": "date",
+            "Time": "time"
+        }
+        entries = {}
+
+        # Labels and Entry widgets
+        for i, (label, key) in enumerate(fields.items()):
+            tk.Label(update_window, text=label, bg="lightyellow", font=("Arial", 12)).grid(row=i, column=0, padx=10, pady=5, sticky="w")
+            entry = tk.Entry(update_window, font=("Arial", 12), width=30)
+            entry.insert(0, appointment[i+1])  # Prefill with existing data
+            entry.grid(row=i, column=1, padx=10, pady=5, sticky="w")
+            entries[key] = entry
+
+        # Edits of a recurring booking can carry over to the rest of the series
+        whole_series = tk.BooleanVar(value=False)
+        if series is not None and series[1] is not None and series[2] > 1:
+            tk.Checkbutton(update_window, text=f"Also change the later appointments (every {series[1]} weeks)", variable=whole_series,
+                           bg="lightyellow").grid(row=len(fields), column=0, columnspan=2, padx=10, sticky="w")
+
+        def saved(result):
+            # Refresh only the edited rows, keeping scroll position and selection
+            for appointment_id in result or [appointment[0]]:  # update_series returns every id it changed
+                self.refresh_appointment_row(appointment_id)
+            messagebox.showinfo("Success", "Appointment updated successfully!")
+            update_window.destroy()
+
+        def save_failed(error):
+            if isinstance(error, AppointmentNotFoundError):
+                messagebox.showerror("Error", "This appointment no longer exists! It was deleted or archived meanwhile.", parent=update_window)
+                update_window.destroy()
+                if not self.page_options["include_archive"]:
+                    self.refresh_appointment_row(appointment[0])
+            elif isinstance(error, SlotTakenError):
+                messagebox.showerror("Slot Taken", str(error), parent=update_window)
+            elif isinstance(error, ValueError):
+                messagebox.showerror("Invalid Appointment", str(error), parent=update_window)
+            else:
+                self.show_database_error(error)
+
+        def save_changes():
+            # Save updated values back to the database
+            self.db.submit("update_series" if whole_series.get() else "update_appointment", appointment[0],
+                           entries["name"].get(), entries["phone"].get(), entries["email"].get(),
+                           entries["service"].get(), entries["stylist"].get(), entries["date"].get(), entries["time"].get(),
+                           callback=saved, errback=save_failed)
+
+        # Save button
+        tk.Button(update_window, text="Save Changes", command=save_changes, bg="lightgreen", font=("Arial", 12), width=20).grid(row=len(fields) + 1, column=0, columnspan=2, pady=20)
+        
+    @profiled("screen: display_stylist_info")
+    def display_stylist_info(self):
+        self.view_generation += 1
+        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
+        self.showing_appointments = False
+        self.catalog_view = "stylists"
+        self.treeview["columns"] = ("Stylist", "Experience", "Specialty", "Email")
+        
+        # Set column headings with alignment
+        for col in self.treeview["columns"]:
+            self.treeview.heading(col, text=col, anchor="center")
+            self.treeview.column(col, anchor="center", width=100)  # Adjust width as needed
+
+        # Insert data rows
+        self.drawn_catalog["treeview"] = self.catalog.stylists
+        for stylist, info in self.catalog.stylists.items():
+            self.treeview.insert("", tk.END, values=(stylist, info["experience"], info["specialty"], info["email"]))
+
+    @profiled("screen: display_service_info")
+    def display_service_info(self):
+        self.view_generation += 1
+        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
+        self.showing_appointments = False
+        self.catalog_view = "services"
+        self.treeview["columns"] = ("Service", "Price")
+        
+        # Set column headings with alignment
+        for col in self.treeview["columns"]:
+            self.treeview.heading(col, text=col, anchor="center")
+            self.treeview.column(col, anchor="center", width=100)  # Adjust width as needed
+
+        # Insert data rows
+        self.drawn_catalog["treeview"] = self.catalog.services
+        for service, price in self.catalog.services.items():
+            self.treeview.insert("", tk.END, values=(service, price))
+
+    @profiled("screen: display_report")
+    def display_report(self):
+        group = self.report_group_var.get()
+        self.view_generation += 1
+        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
+        self.showing_appointments = False
+        self.catalog_view = None
+        self.treeview["columns"] = (group.title(), "Bookings", "Revenue", "Utilization")
+
+        # Set column headings with alignment
+        for col in self.treeview["columns"]:
+            self.treeview.heading(col, text=col, anchor="center")
+            self.treeview.column(col, anchor="center", width=100)  # Adjust width as needed
+
+        def show(rows):
+            for label, bookings, revenue, utilization in rows:
+                self.treeview.insert("", tk.END, values=(label, bookings, f"{revenue:,.2f}", "-" if utilization is None else f"{utilization:.0%}"))
+
+        def report_failed(error):
+            if isinstance(error, ValueError):
+                messagebox.showerror("Invalid Report", str(error))
+            else:
+                self.show_database_error(error)
+
+        self.db.submit("report", group, self.report_from_entry.get(), self.report_to_entry.get(),
+                       callback=self.for_current_view(show), errback=report_failed)
+
+    def display_diagnostics(self):
+        # Latency percentiles per SQL statement, engine call and screen, most total time first
+        self.view_generation += 1
+        self.treeview.delete(*self.treeview.get_children())  # Clear any previous data
+        self.showing_appointments = False
+        self.catalog_view = None
+        self.treeview["columns"] = ("Operation", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Rows")
+
+        # Set column headings with alignment
+        for col in self.treeview["columns"]:
+            self.treeview.heading(col, text=col, anchor="center")
+            self.treeview.column(col, anchor="center", width=70)
+        self.treeview.column("Operation", anchor="w", width=360)
+
+        # Insert data rows
+        for operation, summary in self.metrics.summary():
+            self.treeview.insert("", tk.END, values=(operation, summary["count"], summary["p50_ms"], summary["p95_ms"],
+                                                     summary["p99_ms"], summary["max_ms"], summary["rows"]))
+
+    @profiled("screen: show_login_screen")
+    def show_login_screen(self):
+        self.show_screen("login", self.build_login_screen, self.reset_login_screen)
+
+    def build_login_screen(self, screen):
+        # Frame for Login Screen
+        login_frame = tk.Frame(screen, bg="lightyellow")
+        login_frame.pack(pady=70)
+
+        # Login Title
+        tk.Label(screen, text="Login to Book Appointment", font=("Times", 20, "bold"), pady=20, bg="lightyellow").pack()
+
+        # Instructions Label
+        tk.Label(screen, text="Enter username and password to proceed:", font=("Times", 14), pady=10, bg="lightyellow").pack()
+
+        # Username Label and Entry
+        tk.Label(screen, text="Username:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
+        self.username_entry = tk.Entry(screen, font=("Arial", 12))
+        self.username_entry.pack(pady=5)
+
+        # Password Label and Entry
+        tk.Label(screen, text="Password:", font=("Arial", 12), bg="lightyellow").pack(pady=5)
+        self.password_entry = tk.Entry(screen, show="*", font=("Arial", 12))
+        self.password_entry.pack(pady=5)
+
+        # Login Button
+        login_button = tk.Button(screen, text="Login", command=self.login, bg="lightblue", font=("Arial", 14), width=20, height=2)
+        login_button.pack(pady=20)
+
+    def reset_login_screen(self):
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+        self.username_entry.focus_set()
+
+    def login(self):
+        username = self.username_entry.get()
+        password = self.password_entry.get()
+
+        # Hardcoded credentials for simplicity
+        if username == "" and password == "":
+            self.create_booking_screen()  # Proceed to booking screen after successful login
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password")
+
+    @profiled("screen: create_booking_screen")
+    def create_booking_screen(self):
+        self.show_screen("booking", self.build_booking_screen, self.reset_booking_screen)
+
+    def build_booking_screen(self, screen):
+        # Create a frame to hold the entire booking form
+        main_frame = tk.Frame(screen, bg="lightblue")
+        main_frame.pack(padx=20, pady=20, fill='both', expand=True)
+
+        # Create a grid layout: 2 columns, with left and right frames
+        main_frame.grid_columnconfigure(0, weight=1, uniform="group1")
+        main_frame .grid_columnconfigure(1, weight=1, uniform="group1")
+
+        # Left Side Frame
+        left_frame = tk.Frame(main_frame, bg="lightblue")
+        left_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+
+        # Right Side Frame
+        right_frame = tk.Frame(main_frame, bg="lightblue")
+        right_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
+        
+
+        # Title Label
+        tk.Label(left_frame, text="Salon Appointment Booking", font=("Times", 16, "bold"), pady=10, bg="lightblue").grid(row=0, column=0, columnspan=2, sticky="w")
+
+        # Customer Name
+        tk.Label(left_frame, text="Customer Name:", anchor="w", bg="lightblue").grid(row=1, column=0, pady=5, padx=10, sticky="w")
+        self.name_entry = tk.Entry(left_frame, width=30)
+        self.name_entry.grid(row=1, column=1, pady=5, padx=10, sticky="w")
+
+        # Customer Phone Number
+        tk.Label(left_frame, text="Phone Number:", anchor="w", bg="lightblue").grid(row=2, column=0, pady=5, padx=10, sticky="w")
+        self.phone_entry = tk.Entry(left_frame, width=30)
+        self.phone_entry.grid(row=2, column=1, pady=5, padx=10, sticky="w")
+
+        # Customer Email
+        tk.Label(left_frame, text="Email:", anchor="w", bg="lightblue").grid(row=3, column=0, pady=5, padx=10, sticky="w")
+        self.email_entry = tk.Entry(left_frame, width=30)
+        self.email_entry.grid(row=3, column=1, pady=5, padx=10, sticky="w")
+
+        # Service Options (on the left side)
+        tk.Label(left_frame, text="Service:", anchor="w", bg="lightblue").grid(row=4, column=0, pady=5, padx=10, sticky="w")
+        self.service_listbox = tk.Listbox(left_frame, height=5, width=30, selectmode=tk.EXTENDED)  # Several services make one visit
+        self.fill_service_listbox()
+        self.service_listbox.grid(row=4, column=1, pady=5, padx=10, sticky="w")
+
+        # Stylist Selection
+        tk.Label(right_frame, text="Select Stylist:", anchor="w", bg="lightblue").grid(row=1, column=0, pady=5, padx=10, sticky="w")
+        self.stylist_var = tk.StringVar(value="STYLIST")
+        self.stylist_menu = tk.OptionMenu(right_frame, self.stylist_var, "")
+        self.fill_stylist_menu()
+        self.stylist_menu.grid(row=1, column=1, pady=5, padx=10, sticky="w")
+
+        # Date
+        tk.Label(right_frame, text="Date (YYYY-MM-DD):", anchor="w", bg="lightblue").grid(row=2, column=0, pady=5, padx=10, sticky="w")
+        self.date_entry = tk.Entry(right_frame, width=30)
+        self.date_entry.grid(row=2, column=1, pady=5, padx=10, sticky="w")
+
+        # Time
+        tk.Label(right_frame, text="Time:", anchor="w", bg="lightblue").grid(row=3, column=0, pady=5, padx=10, sticky="w")
+        self.time_var = tk.StringVar(value="TIME")
+        self.time_menu = tk.OptionMenu(right_frame, self.time_var, *TIME_SLOTS)
+        self.time_menu.grid(row=3, column=1, pady=5, padx=10, sticky="w")
+
+        # Grey out taken slots whenever the stylist or date changes
+        self.stylist_var.trace_add("write", self.refresh_time_slots)
+        self.date_entry.bind("<KeyRelease>", self.refresh_time_slots)
+
+        # Payment Method Selection (on the right side)
+        tk.Label(right_frame, text="Payment Method:", anchor="w", bg="lightblue").grid(row=4, column=0, pady=5, padx=10, sticky="w")
+        self.payment_var = tk.StringVar(value="Payment Method")
+        payment_methods = ["Credit Card", "Cash", "Pay Pal"]
+        self.payment_menu = tk.OptionMenu(right_frame, self.payment_var, *payment_methods)
+        self.payment_menu.grid(row=4, column=1, pady=5, padx=10, sticky="w")
+        
+
+        # Receipt Box (Below Customer Details)
+        receipt_frame = tk.Frame(main_frame, bg="lightblue")
+        receipt_frame.grid(row=1, column=0, columnspan=2, pady=10, padx=10, sticky="nsew")
+
+        # Center the receipt within the frame
+        receipt_title_label = tk.Label(receipt_frame, text="Appointment Receipt", anchor="w", bg="lightblue", font=("Arial", 14, "bold"))
+        receipt_title_label.pack(anchor="w", padx=10, pady=5)
+
+        # Receipt Text Box
+        self.receipt_text = tk.Label(receipt_frame, text="Appointment Receipt details.", anchor="w", bg="lightyellow", font=("Times", 12), width=80, height=10)
+        self.receipt_text.pack(anchor="w", padx=10, pady=5)
+
+        # Back to Welcome Button (on the right side below the receipt)
+        back_button = tk.Button(receipt_frame, text="Exit", command=self.create_welcome_screen, bg="lightcoral", width=20)
+        back_button.pack(pady=10, padx=10, side="right")
+
+        # Recurring bookings: how often and how many appointments
+        tk.Label(right_frame, text="Repeat:", anchor="w", bg="lightblue").grid(row=5, column=0, pady=5, padx=10, sticky="w")
+        repeat_frame = tk.Frame(right_frame, bg="lightblue")
+        repeat_frame.grid(row=5, column=1, pady=5, padx=10, sticky="w")
+        self.repeat_var = tk.StringVar(value="Does not repeat")
+        tk.OptionMenu(repeat_frame, self.repeat_var, *REPEAT_CHOICES).pack(side="left")
+        tk.Label(repeat_frame, text="times:", bg="lightblue").pack(side="left", padx=5)
+        self.repeat_count = tk.Spinbox(repeat_frame, from_=2, to=MAX_SERIES_OCCURRENCES, width=4)
+        self.repeat_count.pack(side="left")
+
+        # Fill in the earliest free slot with a stylist whose specialty covers the chosen service
+        soonest_button = tk.Button(right_frame, text="Soonest Available", command=self.find_soonest_slot, bg="lightyellow", width=20)
+        soonest_button.grid(row=6, column=0, columnspan=2, pady=5, padx=10)
+
+        # Submit Button (on the right side)
+        submit_button = tk.Button(right_frame, text="Book Appointment", command=self.book_appointment, bg="lightgreen", width=20)
+        submit_button.grid(row=7, column=0, columnspan=2, pady=10, padx=10)
+
+    def reset_booking_screen(self):
+        # Empty form for the next customer; the service and stylist choices are only refilled when the catalog changed
+        for entry in (self.name_entry, self.phone_entry, self.email_entry, self.date_entry):
+            entry.delete(0, tk.END)
+        self.catalog_changed()
+        self.service_listbox.selection_clear(0, tk.END)
+        self.service_listbox.activate(0)
+        self.service_listbox.see(0)
+        self.time_var.set("TIME")
+        self.payment_var.set("Payment Method")
+        self.repeat_var.set("Does not repeat")
+        self.repeat_count.delete(0, tk.END)
+        self.repeat_count.insert(0, REPEAT_COUNT)
+        self.stylist_var.set("STYLIST")  # Re-enables every time slot through refresh_time_slots
+        self.receipt_text.config(text="Appointment Receipt details.")
+        self.name_entry.focus_set()
+
+    def fill_service_listbox(self):
+        # Service choices come from the catalog cache
+        self.drawn_catalog["service_listbox"] = self.catalog.services
+        self.service_listbox.delete(0, tk.END)
+        for service, price in self.catalog.services.items():
+            self.service_listbox.insert(tk.END, f"{service} - ${price}")
+
+    def fill_stylist_menu(self):
+        self.drawn_catalog["stylist_menu"] = self.catalog.stylists
+        menu = self.stylist_menu["menu"]
+        menu.delete(0, tk.END)
+        for stylist in self.catalog.stylists:
+            menu.add_command(label=stylist, command=tk._setit(self.stylist_var, stylist))
+        if self.stylist_var.get() not in self.catalog.stylists:
+            self.stylist_var.set("STYLIST")
+
+    def refresh_time_slots(self, *args):
+        # Taken slots come from the engine's in-memory occupancy bitmap, not a query per redraw
+        stylist = self.stylist_var.get()
+        date = self.date_entry.get()
+        try:
+            day = parse_date(date).isoformat()  # Typed dates are looked up in their stored ISO form
+        except ValueError:
+            self.apply_taken_slots(stylist, date, [])  # Date not fully typed yet
+            return
+        if stylist not in self.catalog.stylists:
+            self.apply_taken_slots(stylist, date, [])
+            return
+        self.db.submit("taken_slots", stylist, day, callback=lambda taken: self.apply_taken_slots(stylist, date, taken))
+
+    def apply_taken_slots(self, stylist, date, taken):
+        # Ignore answers for a stylist or date the user has already changed
+        if not self.booking_screen_open() or (stylist, date) != (self.stylist_var.get(), self.date_entry.get()):
+            return
+        menu = self.time_menu["menu"]
+        for index, slot in enumerate(TIME_SLOTS):
+            menu.entryconfig(index, state="disabled" if slot in taken else "normal")
+        if self.time_var.get() in taken:
+            self.time_var.set("TIME")
+
+    def find_soonest_slot(self):
+        service = self.service_listbox.get(tk.ACTIVE).split(" - ")[0]
+        if not service:
+            messagebox.showerror("Error", "Choose a service first")
+            return
+        today = calendar_date.today()
+
+        def show(found):
+            if not self.booking_screen_open():
+                return
+            if not found:
+                messagebox.showinfo("No Free Slot", f"No stylist for {service} is free in the next {SOONEST_DAYS} days.")
+                return
+            stylist, date, time = found[0]
+            self.stylist_var.set(stylist)
+            self.date_entry.delete(0, tk.END)
+            self.date_entry.insert(0, date)
+            self.refresh_time_slots()
+            self.time_var.set(time)
+            options = "\n".join(f"\t{date}  {time:<14}{stylist}" for stylist, date, time in found)
+            self.receipt_text.config(text=f"\tSoonest available for {service}:\n{options}")
+
+        def search_failed(error):
+            if isinstance(error, ValueError):
+                messagebox.showerror("Invalid Search", str(error))
+            else:
+                self.show_database_error(error)
+
+        self.db.submit("find_available_slots", service, today.isoformat(), (today + timedelta(days=SOONEST_DAYS - 1)).isoformat(),
+                       callback=self.for_current_view(show), errback=search_failed)
+
+    def update_receipt_text(self, name, service, date, time, stylist, payment_method):
+    # Update the receipt box text with aligned formatting
+
+        receipt_details = (
+        f"\t{'Appointment Details:':<25}\n"
+        f"\t{'Name':<15}:      {name}\n"
+        f"\t{'Service':<15}:   {service}\n"
+        f"\t\t{'Date':<15} :     {date}\n"
+        f"\t{'Time':<16} :     {time}\n"
+        f"\t{'Stylist':<15}:   {stylist}\n"
+        f"\t{'Payment Method':<15}: {payment_method}"
+        )   
+        self.receipt_text.config(text=receipt_details)
+
+
+    def book_appointment(self):
+        name = self.name_entry.get()
+        phone = self.phone_entry.get()
+        email = self.email_entry.get()
+        service = self.service_listbox.get(tk.ACTIVE)
+        stylist = self.stylist_var.get()
+        date = self.date_entry.get()
+        time = self.time_var.get()
+        payment_method = self.payment_var.get()
+
+        if not name or not phone or not email or not service or not stylist or not date or not time or not payment_method:
+            messagebox.showerror("Error", "All fields are required!")
+            return
+
+        # Several selected services make one visit in consecutive slots; a repeat books a linked series
+        services = [self.service_listbox.get(index).split(" - ")[0] for index in self.service_listbox.curselection()] or [service.split(" - ")[0]]
+        every_weeks = REPEAT_CHOICES[self.repeat_var.get()]
+        summary = ", ".join(services)
+        if len(services) > 1:
+            if every_weeks:
+                messagebox.showerror("Error", "Only a single service can repeat")
+                return
+            if time not in TIME_SLOTS or TIME_SLOTS.index(time) + len(services) > len(TIME_SLOTS):
+                messagebox.showerror("Error", f"Not enough slots left after {time} for {len(services)} services")
+                return
+            first = TIME_SLOTS.index(time)
+            bookings = [(service_name, stylist, date, TIME_SLOTS[first + offset]) for offset, service_name in enumerate(services)]
+            request = ("book_appointments", name, phone, email, bookings)
+        elif every_weeks:
+            try:
+                count = int(self.repeat_count.get())
+            except ValueError:
+                messagebox.showerror("Error", "Enter how many times the appointment repeats")
+                return
+            request = ("book_series", name, phone, email, services[0], stylist, date, time, every_weeks, count)
+            summary += f" (every {every_weeks} weeks, {count} times)"
+        else:
+            request = ("book_appointment", name, phone, email, services[0], stylist, date, time)
+
+        appointment = {
+            "name":    name,
+            "phone":   phone,
+            "email":   email,
+            "service": services[0],
+            "stylist": stylist,
+            "date":    date,
+            "time":    time
+        }
+
+        def booked(result):
+            # Update the receipt with the entered data
+            if self.booking_screen_open():
+                self.update_receipt_text(name, summary, date, time, stylist, payment_method)
+                self.refresh_time_slots()
+            if request[0] == "book_appointment":
+                self.refresh_appointment_row(result)  # Show the new booking if the customer list is open
+            self.appointments.append(appointment)
+
+        def booking_failed(error):
+            if isinstance(error, SlotTakenError):
+                messagebox.showerror("Slot Taken", str(error))
+                if self.booking_screen_open():
+                    self.refresh_time_slots()
+            elif isinstance(error, ValueError):
+                messagebox.showerror("Invalid Appointment", str(error))
+            else:
+                self.show_database_error(error)
+
+        # Insert the appointment data into the database; a series or visit goes in as one transaction
+        self.db.submit(*request, callback=booked, errback=booking_failed)
+
+        #messagebox.showinfo("Success", "Appointment booked successfully!")
+        #self.create_welcome_screen()  # Return to welcome screen after booking
+
+    def booking_screen_open(self):
+        return self.current_screen == "booking"
+
+    def show_screen(self, name, build, reset=None):
+        # Raise a screen, building it on first use; reset() clears its form state on every visit
+        self.view_generation += 1
+        self.catalog_view = None
+        self.showing_appointments = False
+        if name not in self.screens:
+            screen = tk.Frame(self.root, bg="lightyellow")
+            screen.grid(row=0, column=0, sticky="nsew")
+            build(screen)
+            self.screens[name] = screen
+        self.current_screen = name
+        if reset:
+            reset()
+        self.screens[name].tkraise()
+
+def main():
+    # Create the main window and pass it to the SalonBookingSystem
+    root = tk.Tk()
+    metrics = Metrics.from_environment()  # Profiling is opt-in through SALON_METRICS
+    app = SalonBookingSystem(root, partial(BookingEngine, metrics=metrics), metrics)
+    root.mainloop()
+    app.db.stop()
+    if metrics is not None:
+        metrics.save()
+
+
+if __name__ == "__main__":
+    main()
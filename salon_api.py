@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as calendar_date, timedelta
+from functools import partial
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from salon_availability import TIME_SLOTS, parse_date
+from salon_db import is_busy_error
+from salon_engine import APPOINTMENT_FIELDS, DB_PATH, FIND_LIMIT, MAX_SERIES_OCCURRENCES, AppointmentNotFoundError, BookingEngine, SlotTakenError
+from salon_metrics import Metrics
+
+# JSON booking service for online and kiosk clients, sharing the database
+# with the front-desk app.
+#
+#   python salon_api.py --port 8080
+#
+#   GET    /services                         {"Haircut": 80, ...}
+#   GET    /stylists                         {"Anna Reyes": {"experience": ..., ...}, ...}
+#   GET    /slots?stylist=NAME&date=DATE     {"stylist", "date", "free": [...], "taken": [...]}
+#   GET    /slots/soonest?service=NAME&from=DATE&to=DATE&limit=N
+#                                            [{"stylist", "date", "time"}, ...] earliest first
+#   GET    /appointments?phone=PHONE&archived=1
+#                                            [appointment, ...], archived ones included when asked
+#   GET    /appointments/ID                  appointment
+#   POST   /appointments                     {"name", "phone", "email", "service", "stylist", "date", "time"} -> 201
+#   PUT    /appointments/ID                  same body -> 200
+#   DELETE /appointments/ID                  204
+#   POST   /series                           appointment body plus {"every_weeks", "count" or "until"}, or
+#                                            {"name", "phone", "email", "bookings": [{"service", "stylist", "date", "time"}, ...]}
+#                                            for one visit -> 201 series
+#   GET    /series/ID                        {"id", "every_weeks", "appointments": [...]}
+#   DELETE /series/ID?from=DATE              cancels the whole series, or only from DATE on -> 204
+#
+# Errors come back as {"error": message} with 400 for invalid input, 404 for
+# unknown appointments, 409 when the slot is taken and 503 when the database
+# stays locked. The event loop only parses and writes HTTP; every engine call
+# runs on a thread pool. Concurrent bookings of one slot are settled inside
+# the engine's BEGIN IMMEDIATE transaction and the UNIQUE (stylist, start)
+# index, so exactly one of them succeeds.
+
+HOST = "127.0.0.1"
+PORT = 8080
+WORKERS = 8  # Threads running engine calls; writes serialize on the database anyway
+MAX_BODY = 64 * 1024
+MAX_HEADERS = 100
+SOONEST_DAYS = 30  # Default search window of /slots/soonest
+MAX_SOONEST = 100
+
+STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    # Next request on a keep-alive connection as (method, path, query, headers, body), or None at EOF
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(431, "Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    headers[":version"] = version
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return method.upper(), unquote(url.path), parse_qs(url.query), headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keep_alive else "close")]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def appointment_json(row):
+    return dict(zip(("id",) + APPOINTMENT_FIELDS, row))
+
+
+class BookingAPI:
+    def __init__(self, engine, workers=WORKERS):
+        self.engine = engine
+        self.metrics = engine.metrics
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="salon-api")
+        self.routes = [
+            ("GET", re.compile(r"/services"), self.get_services),
+            ("GET", re.compile(r"/stylists"), self.get_stylists),
+            ("GET", re.compile(r"/slots"), self.get_slots),
+            ("GET", re.compile(r"/slots/soonest"), self.get_soonest_slots),
+            ("GET", re.compile(r"/appointments"), self.find_appointments),
+            ("POST", re.compile(r"/appointments"), self.book),
+            ("GET", re.compile(r"/appointments/(\d+)"), self.get_appointment),
+            ("PUT", re.compile(r"/appointments/(\d+)"), self.update),
+            ("DELETE", re.compile(r"/appointments/(\d+)"), self.cancel),
+            ("POST", re.compile(r"/series"), self.book_series),
+            ("GET", re.compile(r"/series/(\d+)"), self.get_series),
+            ("DELETE", re.compile(r"/series/(\d+)"), self.cancel_series),
+        ]
+
+    async def call(self, method, *args):
+        # Run a blocking engine call on the thread pool
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(method, *args))
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as error:
+                    write_response(writer, error.status, {"error": str(error)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                status, payload = await self.dispatch(method, path, query, body)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (headers[":version"] == "HTTP/1.1" and connection != "close")
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, query, body):
+        # Route a request and map engine errors to status codes; returns (status, payload)
+        started = time.perf_counter()
+        route = "unmatched"
+        try:
+            allowed = False
+            for route_method, pattern, handler in self.routes:
+                match = pattern.fullmatch(path)
+                if match is None:
+                    continue
+                allowed = True
+                if route_method == method:
+                    route = f"{method} {pattern.pattern}"
+                    return await handler(*match.groups(), query=query, body=body)
+            if allowed:
+                raise HTTPError(405, f"{method} not allowed on {path}")
+            raise HTTPError(404, f"No such resource {path}")
+        except HTTPError as error:
+            return error.status, {"error": str(error)}
+        except AppointmentNotFoundError as error:
+            return 404, {"error": str(error)}
+        except SlotTakenError as error:
+            if error.conflicts:
+                return 409, {"error": str(error), "conflicts": [dict(zip(("stylist", "date", "time"), conflict)) for conflict in error.conflicts]}
+            return 409, {"error": str(error)}
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        except sqlite3.OperationalError as error:
+            if is_busy_error(error):
+                return 503, {"error": "The database is busy, try again"}
+            print(f"{method} {path}: {error!r}", file=sys.stderr)
+            return 500, {"error": "Internal error"}
+        except Exception as error:
+            print(f"{method} {path}: {error!r}", file=sys.stderr)
+            return 500, {"error": "Internal error"}
+        finally:
+            if self.metrics is not None:
+                self.metrics.record("api: " + route, time.perf_counter() - started)
+
+    def json_object(self, body):
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(400, "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+    def booking_fields(self, body):
+        data = self.json_object(body)
+        return [str(data.get(field) or "").strip() for field in APPOINTMENT_FIELDS]
+
+    async def get_services(self, query, body):
+        await self.call(self.engine.refresh_catalog)
+        return 200, self.engine.catalog.services
+
+    async def get_stylists(self, query, body):
+        await self.call(self.engine.refresh_catalog)
+        return 200, self.engine.catalog.stylists
+
+    async def get_slots(self, query, body):
+        stylist = query.get("stylist", [""])[0]
+        date = parse_date(query.get("date", [""])[0]).isoformat()
+        await self.call(self.engine.refresh_catalog)
+        if stylist not in self.engine.catalog.stylists:
+            raise ValueError(f"Unknown stylist {stylist!r}")
+        taken = await self.call(self.engine.taken_slots, stylist, date)
+        return 200, {"stylist": stylist, "date": date, "free": [slot for slot in TIME_SLOTS if slot not in taken], "taken": taken}
+
+    async def get_soonest_slots(self, query, body):
+        service = query.get("service", [""])[0]
+        first = parse_date(query.get("from", [calendar_date.today().isoformat()])[0])
+        last = parse_date(query["to"][0]) if "to" in query else first + timedelta(days=SOONEST_DAYS - 1)
+        try:
+            limit = int(query.get("limit", [FIND_LIMIT])[0])
+        except ValueError:
+            raise ValueError("limit must be a number")
+        if not 1 <= limit <= MAX_SOONEST:
+            raise ValueError(f"limit must be between 1 and {MAX_SOONEST}")
+        found = await self.call(self.engine.find_available_slots, service, first.isoformat(), last.isoformat(), limit)
+        return 200, [{"stylist": stylist, "date": day, "time": slot} for stylist, day, slot in found]
+
+    async def find_appointments(self, query, body):
+        phone = query.get("phone", [""])[0]
+        if not phone:
+            raise ValueError("phone is required")
+        include_archive = query.get("archived", ["0"])[0] in ("1", "true", "yes")
+        return 200, [appointment_json(row) for row in await self.call(self.engine.find_customer_appointments, phone, include_archive)]
+
+    async def get_appointment(self, appointment_id, query, body):
+        row = await self.call(self.engine.get_appointment, int(appointment_id))
+        if row is None:
+            raise HTTPError(404, f"No appointment {appointment_id}")
+        return 200, appointment_json(row)
+
+    async def book(self, query, body):
+        appointment_id = await self.call(self.engine.book_appointment, *self.booking_fields(body))
+        return 201, appointment_json(await self.call(self.engine.get_appointment, appointment_id))
+
+    async def update(self, appointment_id, query, body):
+        fields = self.booking_fields(body)
+        if not all(fields):
+            raise ValueError("All fields are required!")
+        await self.call(self.engine.update_appointment, int(appointment_id), *fields)
+        return 200, appointment_json(await self.call(self.engine.get_appointment, int(appointment_id)))
+
+    async def cancel(self, appointment_id, query, body):
+        if not await self.call(self.engine.delete_appointment, int(appointment_id)):
+            raise HTTPError(404, f"No appointment {appointment_id}")
+        return 204, None
+
+    async def book_series(self, query, body):
+        data = self.json_object(body)
+        customer = [str(data.get(field) or "").strip() for field in ("name", "phone", "email")]
+        if "bookings" in data:
+            bookings = data["bookings"]
+            if not isinstance(bookings, list) or not all(isinstance(booking, dict) for booking in bookings):
+                raise ValueError("bookings must be a list of objects")
+            if len(bookings) > MAX_SERIES_OCCURRENCES:
+                raise ValueError(f"At most {MAX_SERIES_OCCURRENCES} bookings at a time")
+            bookings = [[str(booking.get(field) or "").strip() for field in ("service", "stylist", "date", "time")] for booking in bookings]
+            series_id = await self.call(self.engine.book_appointments, *customer, bookings)
+        else:
+            fields = self.booking_fields(body)
+            try:
+                every_weeks = int(data.get("every_weeks"))
+                count = int(data["count"]) if data.get("count") is not None else None
+            except (TypeError, ValueError):
+                raise ValueError("every_weeks and count must be numbers")
+            until = str(data["until"]) if data.get("until") is not None else None
+            series_id = await self.call(self.engine.book_series, *fields, every_weeks, count, until)
+        return 201, await self.series_json(series_id)
+
+    async def series_json(self, series_id):
+        series = await self.call(self.engine.get_series, series_id)
+        if series is None:
+            raise HTTPError(404, f"No series {series_id}")
+        rows = await self.call(self.engine.list_series, series_id)
+        return {"id": series[0], "every_weeks": series[1], "appointments": [appointment_json(row) for row in rows]}
+
+    async def get_series(self, series_id, query, body):
+        return 200, await self.series_json(int(series_id))
+
+    async def cancel_series(self, series_id, query, body):
+        first = query.get("from", [None])[0]
+        if first is not None:
+            first = parse_date(first).isoformat()
+        if await self.call(self.engine.get_series, int(series_id)) is None:
+            raise HTTPError(404, f"No series {series_id}")
+        await self.call(self.engine.cancel_series, int(series_id), first)
+        return 204, None
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(api, host=HOST, port=PORT, ready=None):
+    # Serve until cancelled; ready(server) is called once the socket is listening
+    server = await asyncio.start_server(api.handle_connection, host, port, backlog=1024)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the salon booking engine as a local JSON API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="threads running database work")
+    args = parser.parse_args(argv)
+
+    metrics = Metrics.from_environment()
+    engine = BookingEngine(args.db, metrics=metrics)
+    api = BookingAPI(engine, args.workers)
+
+    def ready(server):
+        print(f"Serving on http://{args.host}:{server.sockets[0].getsockname()[1]}", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(api, args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+        engine.close()
+        if metrics is not None:
+            metrics.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import sqlite3
+import time
+from datetime import date as calendar_date, timedelta
+
+from salon_db import BACKUP_PAGES, BACKUP_PAUSE
+from salon_engine import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH, DB_PATH, BookingEngine, archive_path_for
+from salon_metrics import Metrics
+
+# Archiving and online backups.
+#
+#   python salon_archive.py archive --days 365
+#   python salon_archive.py archive --before 2024-01-01
+#   python salon_archive.py backup backups/salon-2025-03-01.db
+#
+# archive moves the appointments that are over out of the live table into
+# the archive database kept next to it (salon_appointments_archive.db), each
+# batch in two short transactions, so it can run while the salon is open.
+# Reports still count archived appointments; the admin panel's Include
+# archive box, the API's archived=1 and salon_transfer.py export
+# --include-archive read them back.
+#
+# backup copies the database and its archive through SQLite's online backup
+# API a few pages at a time, both from one read snapshot: bookings go on
+# meanwhile and the two files always match each other.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old salon appointments or take an online backup.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="move appointments that are over to the archive database")
+    archive.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    archive.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive appointments older than this many days")
+    archive.add_argument("--before", help="archive the appointments before this date instead")
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH, help="appointments moved per transaction")
+    backup = commands.add_parser("backup", help="snapshot the database and its archive while the app keeps running")
+    backup.add_argument("path", help="snapshot file; the archive snapshot is written next to it")
+    backup.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    backup.add_argument("--pages", type=int, default=BACKUP_PAGES, help="pages copied per step")
+    backup.add_argument("--pause", type=float, default=BACKUP_PAUSE, help="seconds to wait between steps")
+    args = parser.parse_args(argv)
+
+    metrics = Metrics.from_environment()
+    engine = BookingEngine(args.db, metrics=metrics)
+    started = time.perf_counter()
+    try:
+        if args.command == "archive":
+            before = args.before or (calendar_date.today() - timedelta(days=args.days)).isoformat()
+            try:
+                archived = engine.archive_appointments(before, args.batch_size)
+            except ValueError as error:
+                raise SystemExit(str(error))
+            elapsed = time.perf_counter() - started
+            print(f"Archived {archived} appointments before {before} to {engine.archive_path} in {elapsed:.2f}s")
+        else:
+            try:
+                engine.backup(args.path, args.pages, args.pause)
+            except (OSError, sqlite3.Error) as error:
+                raise SystemExit(f"Backup to {args.path} failed: {error}")
+            elapsed = time.perf_counter() - started
+            print(f"Backed up {args.db} to {args.path} and its archive to {archive_path_for(args.path)} in {elapsed:.2f}s")
+    finally:
+        engine.close()
+        if metrics is not None:
+            metrics.save()
+
+
+if __name__ == "__main__":
+    main()
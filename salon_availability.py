@@ -0,0 +1,214 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import date as calendar_date, datetime, timedelta
+
+# Time slots offered by the booking screen. Each slot owns one bit in a
+# stylist's per-day occupancy bitmap.
+TIME_SLOTS = [
+    "10:00", "11:00",
+    "01:00", "01:30",
+    "02:00", "03:00",
+    "04:00 - 4:30"
+]
+SLOT_BITS = {slot: 1 << index for index, slot in enumerate(TIME_SLOTS)}
+
+# Minute of the day each slot starts at and its length in minutes. The labels
+# leave out am/pm: "01:00" to "04:00 - 4:30" are afternoon slots.
+SLOT_MINUTES = {
+    "10:00": (600, 60), "11:00": (660, 60),
+    "01:00": (780, 30), "01:30": (810, 30),
+    "02:00": (840, 60), "03:00": (900, 60),
+    "04:00 - 4:30": (960, 30)
+}
+SLOT_AT_MINUTE = {minute: slot for slot, (minute, duration) in SLOT_MINUTES.items()}
+SLOT_DAY_MINUTES = sum(duration for minute, duration in SLOT_MINUTES.values())  # Bookable minutes per stylist per day
+DEFAULT_DURATION = 30
+
+EPOCH = calendar_date(1970, 1, 1)
+DATE_FORMATS = ["%Y/%m/%d", "%m/%d/%Y", "%m-%d-%Y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y"]
+TIME_PATTERN = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?", re.IGNORECASE)
+
+
+def parse_date(text):
+    # Date typed by a user or stored by older versions -> datetime.date; ValueError if unreadable
+    text = text.strip()
+    try:
+        return calendar_date.fromisoformat(text)
+    except ValueError:
+        pass
+    for pattern in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, pattern).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised date {text!r}")
+
+
+def parse_time(text):
+    # Slot label or typed time -> (minute of day, duration); ValueError if unreadable.
+    # Like the slot labels, hours 1 to 7 without am/pm are taken as afternoon.
+    text = text.strip()
+    if text in SLOT_MINUTES:
+        return SLOT_MINUTES[text]
+    times = [match for match in TIME_PATTERN.finditer(text) if match.group(2) or match.group(3)]
+    if not times:
+        raise ValueError(f"Unrecognised time {text!r}")
+
+    def minute(match):
+        hour, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+        if meridiem.startswith("p") and hour < 12:
+            hour += 12
+        elif meridiem.startswith("a") and hour == 12:
+            hour = 0
+        elif not meridiem and 1 <= hour <= 7:
+            hour += 12
+        if hour > 23 or minutes > 59:
+            raise ValueError(f"Unrecognised time {text!r}")
+        return hour * 60 + minutes
+
+    start = minute(times[0])
+    if len(times) > 1 and minute(times[1]) > start:
+        return start, minute(times[1]) - start  # A range such as "4:00 - 4:30"
+    if start in SLOT_AT_MINUTE:
+        return SLOT_MINUTES[SLOT_AT_MINUTE[start]]
+    return start, DEFAULT_DURATION
+
+
+def day_start(date):
+    # First epoch-minute of an ISO date
+    return (calendar_date.fromisoformat(date) - EPOCH).days * 1440
+
+
+def day_number(date):
+    # Days since 1970-01-01 of a date as typed
+    return (parse_date(date) - EPOCH).days
+
+
+def appointment_start(date, time):
+    # (date, time) as typed -> (start in epoch-minutes, duration in minutes)
+    minute, duration = parse_time(time)
+    return (parse_date(date) - EPOCH).days * 1440 + minute, duration
+
+
+def current_start():
+    # The local time now in epoch-minutes, the clock appointment starts are stored on
+    now = datetime.now()
+    return (now.date() - EPOCH).days * 1440 + now.hour * 60 + now.minute
+
+
+def slot_bits(minute, duration):
+    # Bits of the slots a booking from minute of the day for duration minutes overlaps
+    return sum(SLOT_BITS[slot] for slot, (first, length) in SLOT_MINUTES.items() if first < minute + duration and minute < first + length)
+
+
+def slot_label(minute):
+    # Display label for a minute of the day: the slot label when it is one, else HH:MM
+    return SLOT_AT_MINUTE.get(minute, f"{minute // 60:02d}:{minute % 60:02d}")
+
+
+def start_date_time(start):
+    # Epoch-minutes -> (ISO date, time label), the form the engine hands out
+    return (EPOCH + timedelta(days=start // 1440)).isoformat(), slot_label(start % 1440)
+
+
+# Number of (stylist, date) bitmaps kept in memory before the least recently used are dropped
+MAX_CACHED_DAYS = 4096
+
+
+# Occupancy bitmaps are kept only while PRAGMA data_version, read on a
+# connection of their own like CatalogCache's, stays put. It moves when any
+# other connection commits: another station, the API process, or this
+# engine's own writer. Every cached day is dropped then, so bookings and
+# cancellations made elsewhere show up on the next lookup.
+class SlotAvailability:
+    def __init__(self, db):
+        self.db = db  # ConnectionManager
+        self.connection = db.connect()  # data_version is per connection
+        self.data_version = None
+        self.occupancy = OrderedDict()  # (stylist, date) -> bitmap of booked slots
+        self.lock = threading.RLock()  # The API serves bookings from a thread pool
+
+    def refresh(self):
+        # Forget every cached day once the database changed since the last check; caller holds the lock.
+        # Read before any day is loaded, so a load is never older than the version it is kept under.
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.data_version:
+            self.occupancy.clear()
+            self.data_version = data_version
+
+    def bitmap(self, stylist, date):
+        # Load the day lazily as a range scan of the (stylist_id, start) index, then serve it from memory.
+        # date is an ISO date.
+        key = (stylist, date)
+        with self.lock:  # Held across the load so a concurrent reserve cannot be overwritten by a stale read
+            self.refresh()
+            if key in self.occupancy:
+                self.occupancy.move_to_end(key)
+                return self.occupancy[key]
+
+            return self.load(stylist, day_start(date), 1)[0]
+
+    def load(self, stylist, first, days):
+        # Read and cache the bitmaps of days days from the epoch-minute first in one range scan; caller holds the lock.
+        # A booking at an off-slot time marks every slot it overlaps.
+        bits = [0] * days
+        rows = self.db.fetchall('''SELECT start, duration FROM appointments
+                                 WHERE stylist_id = (SELECT id FROM stylists WHERE name = ?) AND start >= ? AND start < ?''',
+                                 (stylist, first, first + days * 1440))
+        for start, duration in rows:
+            bits[(start - first) // 1440] |= slot_bits(start % 1440, duration)
+        for day in range(days):
+            key = (stylist, (EPOCH + timedelta(days=first // 1440 + day)).isoformat())
+            self.occupancy[key] = bits[day]
+            self.occupancy.move_to_end(key)
+        while len(self.occupancy) > MAX_CACHED_DAYS:
+            self.occupancy.popitem(last=False)
+        return bits
+
+    def bitmaps(self, stylist, first_date, days):
+        # Bitmaps of days consecutive days from first_date (an ISO date); days not cached are read in one scan
+        first = day_start(first_date)
+        dates = [(EPOCH + timedelta(days=first // 1440 + day)).isoformat() for day in range(days)]
+        with self.lock:
+            self.refresh()
+            if any((stylist, date) not in self.occupancy for date in dates):
+                return self.load(stylist, first, days)
+            return [self.occupancy[(stylist, date)] for date in dates]
+
+    def is_free(self, stylist, date, time):
+        # Times outside TIME_SLOTS have no bit; the overlap check in the write transaction still arbitrates those
+        return not self.bitmap(stylist, date) & SLOT_BITS.get(time, 0)
+
+    def taken_slots(self, stylist, date):
+        bits = self.bitmap(stylist, date)
+        return [slot for slot in TIME_SLOTS if bits & SLOT_BITS[slot]]
+
+    def reserve(self, stylist, date, time):
+        key = (stylist, date)
+        with self.lock:
+            if time not in SLOT_BITS:
+                self.occupancy.pop(key, None)  # Off-slot bookings may cover several slots; reload the day
+            elif key in self.occupancy:
+                self.occupancy[key] |= SLOT_BITS[time]
+
+    def release(self, stylist, date, time):
+        key = (stylist, date)
+        with self.lock:
+            if time not in SLOT_BITS:
+                self.occupancy.pop(key, None)
+            elif key in self.occupancy:
+                self.occupancy[key] &= ~SLOT_BITS[time]
+
+    def invalidate(self, stylist, date):
+        # Forget a day whose bookings changed behind our back, e.g. from another terminal
+        with self.lock:
+            self.occupancy.pop((stylist, date), None)
+
+    def clear(self):
+        with self.lock:
+            self.occupancy.clear()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
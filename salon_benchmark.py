@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date as calendar_date, timedelta
+from itertools import islice
+
+from salon_availability import TIME_SLOTS
+from salon_engine import DEFAULT_SERVICES, DEFAULT_STYLISTS, BookingEngine, archive_path_for, listing_key
+
+# Reproducible benchmarks for the booking engine.
+#
+#   python salon_benchmark.py --sizes 10000 100000 1000000 --output bench.json
+#
+# Every size gets a fresh database filled by a seeded generator, then the
+# code paths behind the GUI are timed and written out as JSON so runs from
+# different releases can be compared.
+
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_SEED = 42
+START_DATE = calendar_date(2020, 1, 1)
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Juan", "Grace", "Mark", "Joy", "Paolo", "Liza", "Carlo", "Bea", "Miguel"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Aquino"]
+EXTRA_SERVICES = [("Hair Color", 1200), ("Rebond", 2500), ("Hair Treatment", 900), ("Nail Art", 300), ("Blow Dry", 250)]
+
+
+def generate_catalog(engine, stylist_count, rng):
+    # Default catalog plus extra services and generated stylists, enough chairs for the booking volume
+    services = DEFAULT_SERVICES + EXTRA_SERVICES
+    stylists = list(DEFAULT_STYLISTS)
+    service_names = [name for name, price in services]
+    for number in range(len(stylists) + 1, stylist_count + 1):
+        specialty = ", ".join(rng.sample(service_names, 3))
+        stylists.append((f"Stylist {number:03d}", f"{rng.randint(1, 15)} years", specialty, f"stylist{number}@example.com"))
+
+    def insert(cursor):
+        cursor.executemany("INSERT OR IGNORE INTO services (service_name, price) VALUES (?, ?)", services)
+        cursor.executemany("INSERT OR IGNORE INTO stylists (name, experience, specialty, email) VALUES (?, ?, ?, ?)", stylists)
+    engine.db.write(insert)
+    return service_names, [row[0] for row in stylists]
+
+
+def generate_appointments(size, services, stylists, rng, fill=0.8):
+    # Yield import rows for `size` bookings spread over consecutive days, each slot taken with probability `fill`
+    customers = max(size // 5, 1)  # Regulars come back about five times
+    produced = 0
+    day = 0
+    while produced < size:
+        date = (START_DATE + timedelta(days=day)).isoformat()
+        for stylist in stylists:
+            for slot in TIME_SLOTS:
+                if produced == size:
+                    return
+                if rng.random() >= fill:
+                    continue
+                customer = rng.randrange(customers)
+                name = f"{FIRST_NAMES[customer % len(FIRST_NAMES)]} {LAST_NAMES[customer // len(FIRST_NAMES) % len(LAST_NAMES)]} {customer}"
+                yield (produced, name, f"09{customer:09d}", f"customer{customer}@example.com", rng.choice(services), stylist, date, slot)
+                produced += 1
+        day += 1
+
+
+def populate(engine, size, seed, chunk_size=10000):
+    rng = random.Random(seed)
+    stylist_count = max(len(DEFAULT_STYLISTS), size // (len(TIME_SLOTS) * 365 * 4) + 1)  # About four years of history
+    services, stylists = generate_catalog(engine, stylist_count, rng)
+    rows = generate_appointments(size, services, stylists, rng)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        engine.import_appointments(chunk)
+    return services, stylists
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "total_s": round(total, 6),
+        "ops_per_s": round(len(ordered) / total, 1) if total else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(percentile(0.50), 4),
+        "p95_ms": round(percentile(0.95), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def measure(operation, arguments):
+    # Time operation(*args) once per argument tuple
+    latencies = []
+    for args in arguments:
+        started = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def run_size(size, seed, workdir, repeat):
+    path = os.path.join(workdir, f"bench_{size}.db")
+    for stale in (path, archive_path_for(path)):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(stale + suffix):
+                os.remove(stale + suffix)
+
+    engine = BookingEngine(path)
+    try:
+        started = time.perf_counter()
+        services, stylists = populate(engine, size, seed)
+        populate_s = time.perf_counter() - started
+
+        rng = random.Random(seed + 1)
+        ids = [row[0] for row in engine.db.fetchall("SELECT id FROM appointments")]
+        phones = [row[0] for row in engine.db.fetchall("SELECT phone FROM appointments WHERE id IN (%s)" % ",".join(map(str, rng.sample(ids, min(repeat, len(ids))))))]
+        last_date = engine.db.fetchone("SELECT date(MAX(start) * 60, 'unixepoch') FROM appointments")[0]
+        future = calendar_date.fromisoformat(last_date) + timedelta(days=30)
+        free_slots = [(stylist, (future + timedelta(days=day)).isoformat(), slot)
+                      for day in range(repeat) for stylist in stylists[:1] for slot in TIME_SLOTS[:1]]
+
+        results = {}
+        results["catalog_load"] = measure(lambda: (engine.fetch_services(), engine.fetch_stylists()), [()] * repeat)
+        results["catalog_refresh"] = measure(engine.refresh_catalog, [()] * repeat)
+        results["book_appointment"] = measure(
+            lambda stylist, date, slot: engine.book_appointment("Bench Customer", "09999999999", "bench@example.com", services[0], stylist, date, slot),
+            free_slots)
+
+        # A year of weekly visits booked as one series against 52 separate bookings, each batch on free slots
+        batches = [(stylists[number % len(stylists)], TIME_SLOTS[1 + number // len(stylists) % (len(TIME_SLOTS) - 1)],
+                    number // (len(stylists) * (len(TIME_SLOTS) - 1))) for number in range(max(repeat // 20, 1))]
+        results["book_series_52"] = measure(
+            lambda stylist, slot, day: engine.book_series("Bench Regular", "09999999998", "regular@example.com", services[0], stylist,
+                                                          (future + timedelta(days=400 + day)).isoformat(), slot, 1, 52),
+            batches)
+        results["book_52_singles"] = measure(
+            lambda stylist, slot, day: [engine.book_appointment("Bench Regular", "09999999998", "regular@example.com", services[0], stylist,
+                                                                (future + timedelta(days=800 + day, weeks=week)).isoformat(), slot)
+                                        for week in range(52)],
+            batches)
+
+        # Admin listing: the first page display_customer_info loads, then scrolling through following pages
+        results["admin_list_first_page"] = measure(engine.list_appointments_page, [()] * repeat)
+        keys = []
+        page = engine.list_appointments_page()
+        for _ in range(repeat):
+            if not page:
+                break
+            keys.append((listing_key(page[-1]),))
+            page = engine.list_appointments_page(after=keys[-1][0])
+        results["admin_list_next_page"] = measure(engine.list_appointments_page, keys)
+        results["admin_list_all"] = measure(engine.list_appointments, [()])
+        results["list_week"] = measure(engine.list_appointments_between,
+                                       [((START_DATE + timedelta(days=day)).isoformat(), (START_DATE + timedelta(days=day + 6)).isoformat())
+                                        for day in (rng.randrange(365) for _ in range(repeat))])
+        results["list_stylist_month"] = measure(engine.list_appointments_between,
+                                                [((START_DATE + timedelta(days=day)).isoformat(), (START_DATE + timedelta(days=day + 29)).isoformat(), rng.choice(stylists))
+                                                 for day in (rng.randrange(365) for _ in range(repeat))])
+
+        first_day, last_day = START_DATE.isoformat(), last_date
+        results["report_by_stylist"] = measure(engine.report, [("stylist", first_day, last_day)] * repeat)
+        results["report_by_month"] = measure(engine.report, [("month", first_day, last_day)] * repeat)
+
+        results["lookup_by_customer"] = measure(engine.find_customer_appointments, [(phone,) for phone in phones])
+        results["lookup_by_id"] = measure(engine.get_appointment, [(rng.choice(ids),) for _ in range(repeat)])
+
+        engine.availability.clear()
+        days = [(rng.choice(stylists), (START_DATE + timedelta(days=rng.randrange(365))).isoformat()) for _ in range(repeat)]
+        results["taken_slots_cold"] = measure(engine.taken_slots, days)
+        results["taken_slots_warm"] = measure(engine.taken_slots, days)
+
+        # Soonest free slots for a service over a month of the booked history, stopping at the first five
+        engine.availability.clear()
+        searches = [(rng.choice(services), (START_DATE + timedelta(days=day)).isoformat(), (START_DATE + timedelta(days=day + 29)).isoformat(), 5, 0)
+                    for day in (rng.randrange(365) for _ in range(repeat))]
+        results["find_slots_cold"] = measure(engine.find_available_slots, searches)
+        results["find_slots_warm"] = measure(engine.find_available_slots, searches)
+
+        targets = rng.sample(ids, min(2 * repeat, len(ids)))
+        updates = []
+        for appointment_id in targets[:repeat]:
+            row = engine.get_appointment(appointment_id)
+            updates.append((appointment_id, row[1] + " Jr", row[2], row[3], row[4], row[5], row[6], row[7]))
+        results["update_appointment"] = measure(engine.update_appointment, updates)
+        results["delete_appointment"] = measure(engine.delete_appointment, [(appointment_id,) for appointment_id in targets[repeat:]])
+
+        # Online snapshot of the full database, then the first year of history moved to the archive and listed back
+        results["backup_online"] = measure(engine.backup, [(os.path.join(workdir, f"bench_{size}_backup.db"),)])
+        results["archive_first_year"] = measure(engine.archive_appointments, [((START_DATE + timedelta(days=365)).isoformat(),)])
+        results["admin_list_first_page_with_archive"] = measure(lambda: engine.list_appointments_page(include_archive=True), [()] * repeat)
+        results["lookup_by_customer_with_archive"] = measure(lambda phone: engine.find_customer_appointments(phone, include_archive=True),
+                                                             [(phone,) for phone in phones])
+
+        engine.db.write_connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # Fold the WAL in before sizing the file
+        return {
+            "size": size,
+            "populate_s": round(populate_s, 3),
+            "db_bytes": os.path.getsize(path),
+            "results": results,
+        }
+    finally:
+        engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the salon booking engine on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="bookings per run, e.g. 10000 100000 1000000")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=200, help="operations timed per benchmark")
+    parser.add_argument("--workdir", help="where the benchmark databases go (default: a temporary directory)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        workdir = args.workdir or scratch
+        report = {
+            "meta": {
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "runs": [run_size(size, args.seed, workdir, args.repeat) for size in args.sizes],
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import re
+import threading
+
+# In-memory copy of the service and stylist catalog, shared by every screen.
+#
+# Staleness is checked with PRAGMA data_version on a dedicated connection,
+# which only changes after another connection commits. When it does, the
+# catalog_versions row (bumped by triggers on services and stylists) tells
+# which table actually changed, and only that table is reloaded.
+
+CATALOG_TABLES = ("services", "stylists")
+
+
+def specialty_key(text):
+    # Comparable form of a service name or one specialty: lower case, words singular, so "Haircuts" is "haircut"
+    words = re.findall(r"[a-z]+", text.lower())
+    return " ".join(word[:-1] if word.endswith("s") and not word.endswith("ss") and len(word) > 3 else word for word in words)
+
+
+def qualified_stylists(services, stylists):
+    # {service: [stylist, ...]} parsed from the free-text specialty lists, stylists in catalog order.
+    # A specialty qualifies a stylist for a service with the same name, or one it ends with ("Color" for "Hair Color").
+    specialties = {
+        stylist: {specialty_key(part) for part in re.split(r",|/|;|\band\b|&", details.get("specialty") or "")} - {""}
+        for stylist, details in stylists.items()
+    }
+    qualified = {}
+    for service in services:
+        key = specialty_key(service)
+        qualified[service] = [stylist for stylist, keys in specialties.items()
+                              if any(key == specialty or key.endswith(" " + specialty) for specialty in keys)]
+    return qualified
+
+
+class CatalogCache:
+    def __init__(self, db, loaders):
+        self.db = db  # ConnectionManager
+        self.loaders = loaders  # table name -> function returning the table as a dict
+        self.connection = db.connect()  # data_version is per connection, so the cache keeps its own
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.versions = {}
+        self.tables = {table: {} for table in CATALOG_TABLES}
+        self.qualified = {}  # {service: [stylist, ...]}, rebuilt whenever either table is reloaded
+        self.refresh()
+
+    @property
+    def services(self):
+        # {service_name: price}; replaced, never mutated, so readers on other threads need no lock
+        return self.tables["services"]
+
+    @property
+    def stylists(self):
+        # {name: {"experience", "specialty", "email"}}
+        return self.tables["stylists"]
+
+    def refresh(self):
+        # Reload the catalog tables changed since the last check; returns the names of those tables
+        with self.lock:
+            data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version:
+                return []
+            self.data_version = data_version
+
+            versions = dict(self.connection.execute("SELECT table_name, version FROM catalog_versions").fetchall())
+            changed = [table for table in CATALOG_TABLES if versions.get(table) != self.versions.get(table)]
+            tables = dict(self.tables)
+            for table in changed:
+                tables[table] = self.loaders[table]()
+            self.tables = tables
+            if changed:
+                self.qualified = qualified_stylists(tables["services"], tables["stylists"])
+            self.versions = versions
+            return changed
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
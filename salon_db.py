@@ -0,0 +1,173 @@
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from salon_metrics import ProfiledConnection
+
+# Connection handling for several front-desk stations sharing one database
+# file. Every connection runs in WAL mode so readers never block the writer,
+# waits out short locks through the busy timeout, and retries whole
+# transactions with backoff when SQLite still reports the database busy.
+
+BUSY_TIMEOUT = 5.0  # seconds a statement waits on a lock before SQLITE_BUSY
+MAX_RETRIES = 5
+RETRY_DELAY = 0.05  # first backoff step in seconds, doubled on every retry
+READ_POOL_SIZE = 4
+BACKUP_PAGES = 1024  # pages copied per online backup step
+BACKUP_PAUSE = 0.01  # seconds between backup steps, leaving the disk to the booking screens
+
+
+def is_busy_error(error):
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+class ConnectionManager:
+    def __init__(self, db_path, busy_timeout=BUSY_TIMEOUT, retries=MAX_RETRIES, pool_size=READ_POOL_SIZE, metrics=None, attached=None):
+        self.db_path = db_path
+        self.attached = attached or {}  # Schema name -> database file ATTACHed to every connection
+        self.metrics = metrics  # salon_metrics.Metrics when profiling, else None
+        self.busy_timeout = busy_timeout
+        self.retries = retries
+        self.pool_size = pool_size
+
+        # One writer connection, used under write_lock so in-process writers queue up instead of
+        # fighting over the file lock
+        self.write_connection = self.connect()
+        self.write_lock = threading.RLock()
+
+        # Idle read connections for listing and lookups
+        self.read_pool = queue.LifoQueue()
+        self.read_connections = 0
+        self.pool_lock = threading.Lock()
+
+    def connect(self):
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        if self.metrics is None:
+            connection = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        else:
+            connection = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False,
+                                         factory=ProfiledConnection)
+            connection.metrics = self.metrics  # Every statement on this connection is timed
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")  # Durable across app crashes; WAL keeps it consistent
+        for schema, path in self.attached.items():
+            connection.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            connection.execute(f"PRAGMA {schema}.journal_mode = WAL")
+            connection.execute(f"PRAGMA {schema}.synchronous = NORMAL")
+        return connection
+
+    def with_retries(self, work):
+        # Run work(), retrying with exponential backoff and jitter while the database stays busy
+        for attempt in range(self.retries + 1):
+            try:
+                return work()
+            except sqlite3.OperationalError as error:
+                if not is_busy_error(error) or attempt == self.retries:
+                    raise
+                time.sleep(RETRY_DELAY * (2 ** attempt) * (0.5 + random.random()))
+
+    @contextmanager
+    def transaction(self):
+        # A short BEGIN IMMEDIATE transaction: the write lock is taken up front, so writers serialize
+        # at BEGIN rather than failing mid-transaction when upgrading from a read lock
+        with self.write_lock:
+            cursor = self.write_connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+                cursor.execute("COMMIT")
+            except BaseException:
+                if self.write_connection.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+
+    def write(self, work, *args):
+        # Run work(cursor, *args) in its own write transaction and return its result
+        def attempt():
+            with self.transaction() as cursor:
+                return work(cursor, *args)
+        return self.with_retries(attempt)
+
+    @contextmanager
+    def reader(self):
+        # Borrow a pooled read connection, opening a new one while the pool is below pool_size
+        try:
+            connection = self.read_pool.get_nowait()
+        except queue.Empty:
+            with self.pool_lock:
+                create = self.read_connections < self.pool_size
+                if create:
+                    self.read_connections += 1
+            if not create:
+                connection = self.read_pool.get()
+            else:
+                try:
+                    connection = self.connect()
+                except Exception:
+                    with self.pool_lock:
+                        self.read_connections -= 1
+                    raise
+        try:
+            yield connection
+        finally:
+            self.read_pool.put(connection)
+
+    def read(self, work, *args):
+        # Run work(connection, *args) on a pooled read connection
+        def attempt():
+            with self.reader() as connection:
+                return work(connection, *args)
+        return self.with_retries(attempt)
+
+    def fetchall(self, sql, params=()):
+        return self.read(lambda connection: connection.execute(sql, params).fetchall())
+
+    def fetchone(self, sql, params=()):
+        return self.read(lambda connection: connection.execute(sql, params).fetchone())
+
+    def backup(self, targets, pages=BACKUP_PAGES, pause=BACKUP_PAUSE, progress=None):
+        # Online copy of each schema in targets ({schema: file}) through the backup API, pages at a time.
+        # All copies read from one snapshot held by a read transaction, so in WAL mode writers are never
+        # blocked, commits made meanwhile do not restart the copy, and the files match each other. Each
+        # file is written next to its target and renamed into place once complete.
+        # progress(schema, remaining, total) is called after every step.
+        with self.reader() as connection:
+            connection.execute("BEGIN")
+            try:
+                for schema in targets:
+                    connection.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()  # Pin the snapshot now
+                for schema, path in targets.items():
+                    partial = path + ".part"
+                    if os.path.exists(partial):
+                        os.remove(partial)
+
+                    def step(status, remaining, total):
+                        if progress is not None:
+                            progress(schema, remaining, total)
+                        if remaining and pause:
+                            time.sleep(pause)
+                    target = sqlite3.connect(partial)
+                    try:
+                        connection.backup(target, pages=pages, progress=step, name=schema)
+                    finally:
+                        target.close()
+                    # A WAL left by an earlier copy would be replayed over the new one when it is opened
+                    for stale in (path + "-wal", path + "-shm"):
+                        if os.path.exists(stale):
+                            os.remove(stale)
+                    os.replace(partial, path)
+            finally:
+                connection.execute("COMMIT")
+
+    def close(self):
+        with self.write_lock:
+            self.write_connection.close()
+        while True:
+            try:
+                self.read_pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,1178 @@
+import os
+import re
+import sqlite3
+
+from datetime import timedelta
+
+from salon_availability import (EPOCH, SLOT_BITS, SLOT_DAY_MINUTES, SLOT_MINUTES, TIME_SLOTS, SlotAvailability, appointment_start, current_start,
+                                day_number, parse_date, start_date_time)
+from salon_catalog import CATALOG_TABLES, CatalogCache
+from salon_db import BACKUP_PAGES, BACKUP_PAUSE, BUSY_TIMEOUT, ConnectionManager
+
+# Booking engine shared by the Tk front end and any headless tooling.
+# Nothing in this module touches tkinter, so it can be imported from scripts,
+# workers and benchmarks without opening a window.
+
+DB_PATH = "salon_appointments.db"
+
+DEFAULT_SERVICES = [
+    ("Haircut", 80),
+    ("Manicure", 150),
+    ("Pedicure", 150),
+    ("Facial", 1500),
+    ("Massage", 500)
+]
+
+DEFAULT_STYLISTS = [
+    ("Anna Reyes", "6 years", "Haircuts, Color, Rebond", "anna@example.com"),
+    ("Jane Bien", "4 years", "Manicure, Pedicure, Nail Art", "jane@example.com"),
+    ("Emily Davis", "8 years", "Facial, Massage", "emily@example.com"),
+    ("Lara Hernandez", "4 years", "Haircuts, Color, Hair Treatment", "lara@example.com")
+]
+
+APPOINTMENT_FIELDS = ("name", "phone", "email", "service", "stylist", "date", "time")
+
+# Rows fetched per page by the windowed admin listing
+PAGE_SIZE = 100
+
+# Soonest-slot search: options returned by default, and days of occupancy read per stylist at a time,
+# so a search that fills up early never reads the rest of its window
+FIND_LIMIT = 5
+FIND_CHUNK_DAYS = 7
+FIND_MAX_DAYS = 366
+
+# Longest recurring series booked in one go, two years of fortnightly visits
+MAX_SERIES_OCCURRENCES = 52
+
+# Upcoming appointments read per batch by the reminder job
+REMINDER_BATCH = 500
+
+# Archiving: finished appointments older than this many days leave the live table, ARCHIVE_BATCH per transaction
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH = 1000
+
+# Columns an archived copy must still agree on before the live row is deleted
+ARCHIVE_MATCH_COLUMNS = ("name", "phone", "email", "service_id", "stylist_id", "start", "duration", "series_id")
+
+# Legacy rows converted per transaction by the normalize_appointments migration
+MIGRATION_BATCH = 5000
+
+# Reasons import_appointments gives for the rows it rejects
+IMPORT_OVERLAP = "overlaps another booking"
+IMPORT_NOT_OFFERED = "service or stylist no longer offered"
+
+# Display form of the stored start minute: the slot label when it is one, else HH:MM
+TIME_LABEL_SQL = "CASE a.start % 1440 {0} ELSE strftime('%H:%M', a.start * 60, 'unixepoch') END".format(
+    " ".join(f"WHEN {minute} THEN '{slot}'" for slot, (minute, duration) in SLOT_MINUTES.items()))
+
+# Another booking of the stylist overlapping [start, start + duration); bookings never run past a day
+OVERLAP_SQL = '''SELECT 1 FROM appointments
+                 WHERE stylist_id = (SELECT id FROM stylists WHERE name = ?) AND start > ? - 1440 AND start < ?
+                   AND start + duration > ? AND id IS NOT ?'''
+
+# appointment_details columns in the row shape every engine method returns
+APPOINTMENT_COLUMNS = "id, name, phone, email, service, stylist, date, time"
+# The same plus start, for listings that may merge the archive in (start, id) order; dropped before returning
+LISTING_COLUMNS = APPOINTMENT_COLUMNS + ", start"
+
+# Summary tables and the day number each one files an appointment start (epoch-minutes) under:
+# the day itself, or the first day of its month
+SUMMARY_TABLES = {
+    "daily_summary": "{0} / 1440",
+    "monthly_summary": "CAST(julianday(date({0} * 60, 'unixepoch', 'start of month')) - 2440587.5 AS INTEGER)",
+}
+
+# Trigger bodies counting a booking (NEW) into every summary table, and taking one (OLD) back out
+SUMMARY_ADD_SQL = "".join(f'''
+    INSERT INTO {table} (day, stylist_id, service_id, bookings, minutes)
+    VALUES ({day.format("NEW.start")}, NEW.stylist_id, NEW.service_id, 1, NEW.duration)
+    ON CONFLICT (day, stylist_id, service_id) DO UPDATE SET bookings = bookings + 1, minutes = minutes + excluded.minutes;
+''' for table, day in SUMMARY_TABLES.items())
+SUMMARY_REMOVE_SQL = "".join(f'''
+    UPDATE {table} SET bookings = bookings - 1, minutes = minutes - OLD.duration
+    WHERE day = {day.format("OLD.start")} AND stylist_id = OLD.stylist_id AND service_id = OLD.service_id;
+    DELETE FROM {table}
+    WHERE day = {day.format("OLD.start")} AND stylist_id = OLD.stylist_id AND service_id = OLD.service_id AND bookings <= 0;
+''' for table, day in SUMMARY_TABLES.items())
+# Set-based SUMMARY_ADD_SQL, one statement per summary table: counts in the appointments with an id above ?
+SUMMARY_ADD_BATCH_SQL = [f'''
+    INSERT INTO {table} (day, stylist_id, service_id, bookings, minutes)
+    SELECT {day.format("start")}, stylist_id, service_id, COUNT(*), SUM(duration) FROM appointments WHERE id > ? GROUP BY 1, 2, 3
+    ON CONFLICT (day, stylist_id, service_id) DO UPDATE SET bookings = bookings + excluded.bookings, minutes = minutes + excluded.minutes
+''' for table, day in SUMMARY_TABLES.items()]
+
+# Report groupings: the label each daily_summary row (d, with services s and stylists st) is grouped under.
+# Weeks are labelled by their Monday.
+REPORT_GROUPS = {
+    "stylist": "st.name",
+    "service": "s.service_name",
+    "day": "date(d.day * 86400, 'unixepoch')",
+    "week": "date(d.day * 86400, 'unixepoch', 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', d.day * 86400, 'unixepoch')",
+}
+
+
+def report_period(group, day):
+    # Python twin of the REPORT_GROUPS label for the day and time groupings
+    date = EPOCH + timedelta(days=day)
+    if group == "week":
+        return (date - timedelta(days=date.weekday())).isoformat()
+    if group == "month":
+        return date.strftime("%Y-%m")
+    return date.isoformat()
+
+
+def summary_ranges(group, first, last):
+    # Split the day range first..last into (daily head, whole months, daily tail) ranges, so month, stylist
+    # and service reports read whole months from monthly_summary. Empty ranges are (1, 0).
+    if group in ("day", "week"):
+        return (first, last), (1, 0), (1, 0)
+    first_date, last_date = EPOCH + timedelta(days=first), EPOCH + timedelta(days=last)
+    months_from = first_date if first_date.day == 1 else (first_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    months_to = last_date.replace(day=1) if (last_date + timedelta(days=1)).day == 1 else last_date.replace(day=1) - timedelta(days=1)
+    if months_from > months_to:
+        return (first, last), (1, 0), (1, 0)
+    months_end = (months_to.replace(day=28) + timedelta(days=4)).replace(day=1)  # Day after the last whole month
+    return ((first, (months_from - EPOCH).days - 1), ((months_from - EPOCH).days, (months_to.replace(day=1) - EPOCH).days),
+            ((months_end - EPOCH).days, last))
+
+
+# Phone numbers are indexed as bare digits so "0917-123 4567" and "09171234567" find each other
+PHONE_DIGITS_SQL = "replace(replace(replace(replace(replace({0}, '-', ''), ' ', ''), '+', ''), '(', ''), ')', '')"
+
+
+def search_query(text):
+    # Turn free text into an FTS5 query: every word must match as a prefix of some indexed token
+    terms = []
+    for word in text.split():
+        if re.fullmatch(r"[\d()+\- ]+", word):
+            word = re.sub(r"\D", "", word)
+        word = word.replace('"', "")
+        if word:
+            terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+
+def archive_path_for(db_path):
+    # The archive database kept next to a database file: salon_appointments.db -> salon_appointments_archive.db
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def appointment_query(select, params, include_archive):
+    # select reads "{schema}appointment_details a" (and "{schema}appointments_fts f") and ends in its WHERE
+    # clause. With include_archive the same query over the archive database is added as a second UNION ALL
+    # arm, leaving out rows an interrupted archive run left in both. Returns (sql, params); ORDER BY and
+    # LIMIT go after it.
+    live = select.format(schema="")
+    if not include_archive:
+        return live, tuple(params)
+    archived = select.format(schema="archive.") + " AND NOT EXISTS (SELECT 1 FROM main.appointments l WHERE l.id = a.id)"
+    return f"{live} UNION ALL {archived}", (*params, *params)
+
+
+def listing_key(row):
+    # (start, id) keyset position of an engine row, as list_appointments_page expects
+    return appointment_start(row[6], row[7])[0], row[0]
+
+
+class SlotTakenError(Exception):
+    # Raised when the stylist is already booked at the requested date and time. Batch bookings list every
+    # (stylist, date, time) that clashed in conflicts.
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+class AppointmentNotFoundError(LookupError):
+    # Raised when an appointment being changed is no longer in the live table: deleted or archived meanwhile
+    pass
+
+
+def series_dates(date, every_weeks, count=None, until=None):
+    # ISO dates of a recurring series from date, every every_weeks weeks, for count occurrences or through until
+    first = parse_date(date)
+    if not isinstance(every_weeks, int) or every_weeks < 1:
+        raise ValueError("A series repeats every 1 or more weeks")
+    if count is None and until is None:
+        raise ValueError("A series needs a number of occurrences or an end date")
+    last = parse_date(until) if until is not None else None
+    if last is not None and last < first:
+        raise ValueError("The series ends before it starts")
+    dates = []
+    while count is None or len(dates) < count:
+        day = first + timedelta(weeks=every_weeks * len(dates))
+        if last is not None and day > last:
+            break
+        if len(dates) == MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"A series has at most {MAX_SERIES_OCCURRENCES} occurrences")
+        dates.append(day.isoformat())
+    if not dates:
+        raise ValueError("A series needs at least one occurrence")
+    return dates
+
+
+class BookingEngine:
+    def __init__(self, db_path=DB_PATH, busy_timeout=BUSY_TIMEOUT, metrics=None, archive_path=None):
+        self.db_path = db_path
+        self.archive_path = archive_path or archive_path_for(db_path)
+        self.metrics = metrics  # Optional salon_metrics.Metrics
+        # Appointments moved out by archive_appointments live in their own file, attached as "archive"
+        self.db = ConnectionManager(db_path, busy_timeout=busy_timeout, metrics=metrics, attached={"archive": self.archive_path})
+        self.create_tables()  # Create all required tables
+        self.availability = SlotAvailability(self.db)
+        self.catalog = CatalogCache(self.db, {"services": self.fetch_services, "stylists": self.fetch_stylists})
+
+    def close(self):
+        self.catalog.close()
+        self.availability.close()
+        self.db.close()
+
+    def create_tables(self):
+        self.db.write(self.create_base_tables)
+        self.migrate()
+        self.db.write(self.create_archive_tables)  # The archive file may be new even when the database is not
+
+    def create_base_tables(self, cursor):
+        # Create appointments table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS appointments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                service TEXT,
+                stylist TEXT,
+                date TEXT,
+                time TEXT
+            )
+        ''')
+
+        # Create services table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS services (
+                service_name TEXT PRIMARY KEY,
+                price REAL
+            )
+        ''')
+        self.populate_services(cursor)
+
+        # Create stylists table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stylists (
+                name TEXT PRIMARY KEY,
+                experience TEXT,
+                specialty TEXT,
+                email TEXT
+            )
+        ''')
+        self.populate_stylists(cursor)
+
+    def migrate(self):
+        # Apply the schema migrations this database has not seen yet, tracked in PRAGMA user_version
+        migrations = [
+            self.create_appointment_indexes,
+            self.enforce_unique_slots,
+            self.create_search_index,
+            self.create_catalog_versions,
+            self.normalize_catalog,
+            self.normalize_appointments,
+            self.create_booking_summary,
+            self.create_appointment_series,
+            self.create_reminder_log,
+            self.create_maintenance_flags,
+            self.defer_import_triggers,
+        ]
+        # Bulk work done in its own batched transactions before a step, and cleanup after it
+        prepare = {self.normalize_appointments: self.copy_appointments}
+        finish = {self.normalize_appointments: self.vacuum}
+        version = self.db.fetchone("PRAGMA user_version")[0]
+        for number, migration in enumerate(migrations[version:], start=version + 1):
+            if migration in prepare:
+                prepare[migration](number)
+
+            # Each step commits together with its version bump. Stations starting together on an old
+            # database all get here, so the version is checked again under the write lock and only the
+            # first one applies the step.
+            def step(cursor):
+                if self.migration_applied(cursor, number):
+                    return False
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                return True
+
+            if self.db.write(step) and migration in finish:
+                finish[migration]()
+
+    def migration_applied(self, cursor, number):
+        # True once migration number has been committed, by this station or another one
+        return cursor.execute("PRAGMA user_version").fetchone()[0] >= number
+
+    def create_appointment_indexes(self, cursor):
+        # Secondary indexes so slot checks, date listings and customer lookups avoid full scans;
+        # every index also carries the rowid, so id-only lookups are covered
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_stylist_date_time ON appointments (stylist, date, time)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_phone ON appointments (phone)")
+
+    def enforce_unique_slots(self, cursor):
+        # Park historical double bookings in appointment_conflicts for review, keeping the earliest
+        # booking of each slot, then make the (stylist, date, time) index UNIQUE
+        cursor.execute("CREATE TABLE IF NOT EXISTS appointment_conflicts AS SELECT * FROM appointments WHERE 0")
+        cursor.execute('''
+            INSERT INTO appointment_conflicts
+            SELECT * FROM appointments a
+            WHERE EXISTS (
+                SELECT 1 FROM appointments b
+                WHERE b.stylist = a.stylist AND b.date = a.date AND b.time = a.time AND b.id < a.id
+            )
+        ''')
+        cursor.execute("DELETE FROM appointments WHERE id IN (SELECT id FROM appointment_conflicts)")
+        cursor.execute("DROP INDEX IF EXISTS idx_appointments_stylist_date_time")
+        cursor.execute("CREATE UNIQUE INDEX idx_appointments_stylist_date_time ON appointments (stylist, date, time)")
+
+    def create_search_index(self, cursor):
+        # Contentless FTS5 index over customer name, phone and email, kept in sync by triggers.
+        # Rows are looked up in appointments by rowid, so the index stores no copy of the text.
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS appointments_fts USING fts5(name, phone, email, content='', prefix='2 3')")
+        self.create_search_triggers(cursor)
+        cursor.execute(f"INSERT INTO appointments_fts (rowid, name, phone, email) SELECT id, name, {PHONE_DIGITS_SQL.format('phone')}, email FROM appointments")
+
+    def create_search_triggers(self, cursor):
+        phone = PHONE_DIGITS_SQL.format("NEW.phone")
+        old_phone = PHONE_DIGITS_SQL.format("OLD.phone")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS appointments_fts_insert AFTER INSERT ON appointments BEGIN
+                INSERT INTO appointments_fts (rowid, name, phone, email) VALUES (NEW.id, NEW.name, {phone}, NEW.email);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS appointments_fts_delete AFTER DELETE ON appointments BEGIN
+                INSERT INTO appointments_fts (appointments_fts, rowid, name, phone, email) VALUES ('delete', OLD.id, OLD.name, {old_phone}, OLD.email);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS appointments_fts_update AFTER UPDATE OF name, phone, email ON appointments BEGIN
+                INSERT INTO appointments_fts (appointments_fts, rowid, name, phone, email) VALUES ('delete', OLD.id, OLD.name, {old_phone}, OLD.email);
+                INSERT INTO appointments_fts (rowid, name, phone, email) VALUES (NEW.id, NEW.name, {phone}, NEW.email);
+            END
+        ''')
+
+    def create_catalog_versions(self, cursor):
+        # One version counter per catalog table, bumped by triggers so caches can tell which table changed
+        cursor.execute("CREATE TABLE IF NOT EXISTS catalog_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        for table in CATALOG_TABLES:
+            cursor.execute("INSERT OR IGNORE INTO catalog_versions (table_name, version) VALUES (?, 1)", (table,))
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                        UPDATE catalog_versions SET version = version + 1 WHERE table_name = '{table}';
+                    END
+                ''')
+
+    def normalize_catalog(self, cursor):
+        # Give services and stylists integer ids for appointments to reference; names stay unique
+        cursor.execute('''
+            CREATE TABLE services_v2 (
+                id INTEGER PRIMARY KEY,
+                service_name TEXT NOT NULL UNIQUE,
+                price REAL
+            )
+        ''')
+        cursor.execute("INSERT INTO services_v2 (service_name, price) SELECT service_name, price FROM services ORDER BY rowid")
+        cursor.execute('''
+            CREATE TABLE stylists_v2 (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                experience TEXT,
+                specialty TEXT,
+                email TEXT
+            )
+        ''')
+        cursor.execute("INSERT INTO stylists_v2 (name, experience, specialty, email) SELECT name, experience, specialty, email FROM stylists ORDER BY rowid")
+        for table in CATALOG_TABLES:
+            cursor.execute(f"DROP TABLE {table}")
+            cursor.execute(f"ALTER TABLE {table}_v2 RENAME TO {table}")
+        # The version triggers went with the old tables
+        self.create_catalog_versions(cursor)
+        cursor.execute("UPDATE catalog_versions SET version = version + 1")
+
+    def copy_appointments(self, number):
+        # First half of normalize_appointments (migration number): copy the legacy rows into appointments_v2,
+        # one MIGRATION_BATCH per transaction. Progress is committed with every batch, so an interrupted
+        # migration picks up where it stopped the next time the engine starts. Every transaction stops short
+        # once another station has finished the migration and dropped the legacy columns.
+        def create(cursor):
+            if not self.migration_applied(cursor, number):
+                self.create_normalized_appointments(cursor)
+
+        def copy_batch(cursor):
+            return not self.migration_applied(cursor, number) and self.copy_appointment_batch(cursor)
+
+        self.db.write(create)
+        while self.db.write(copy_batch):
+            pass
+
+    def create_normalized_appointments(self, cursor):
+        # start is minutes since 1970-01-01 00:00 salon time, duration is in minutes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS appointments_v2 (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                service_id INTEGER NOT NULL REFERENCES services (id),
+                stylist_id INTEGER NOT NULL REFERENCES stylists (id),
+                start INTEGER NOT NULL,
+                duration INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_stylist_start ON appointments_v2 (stylist_id, start)")
+        # Legacy rows that could not be converted, kept verbatim for review like appointment_conflicts
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS appointment_rejects (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                service TEXT,
+                stylist TEXT,
+                date TEXT,
+                time TEXT,
+                reason TEXT
+            )
+        ''')
+        cursor.execute("CREATE TABLE IF NOT EXISTS migration_progress (name TEXT PRIMARY KEY, last_id INTEGER NOT NULL)")
+        cursor.execute("INSERT OR IGNORE INTO migration_progress (name, last_id) VALUES ('normalize_appointments', 0)")
+
+    def copy_appointment_batch(self, cursor):
+        # Convert the next MIGRATION_BATCH legacy rows; returns False once there are none left
+        last_id = cursor.execute("SELECT last_id FROM migration_progress WHERE name = 'normalize_appointments'").fetchone()[0]
+        rows = cursor.execute('''SELECT id, name, phone, email, service, stylist, date, time FROM appointments
+                                WHERE id > ? ORDER BY id LIMIT ?''', (last_id, MIGRATION_BATCH)).fetchall()
+        if not rows:
+            return False
+        services = dict(cursor.execute("SELECT service_name, id FROM services").fetchall())
+        stylists = dict(cursor.execute("SELECT name, id FROM stylists").fetchall())
+
+        converted, rejected = [], []
+        for row in rows:
+            appointment_id, name, phone, email, service, stylist, date, time = row
+            if service not in services:
+                rejected.append(row + (f"unknown service {service!r}",))
+            elif stylist not in stylists:
+                rejected.append(row + (f"unknown stylist {stylist!r}",))
+            else:
+                try:
+                    start, duration = appointment_start(date or "", time or "")
+                except ValueError as error:
+                    rejected.append(row + (str(error),))
+                    continue
+                converted.append((appointment_id, name, phone, email, services[service], stylists[stylist], start, duration))
+
+        # Typed dates and times can land two legacy rows on the same start; the first one keeps it
+        cursor.executemany("INSERT OR IGNORE INTO appointments_v2 VALUES (?, ?, ?, ?, ?, ?, ?, ?)", converted)
+        copied = {appointment_id for (appointment_id,) in cursor.execute(
+            "SELECT id FROM appointments_v2 WHERE id BETWEEN ? AND ?", (rows[0][0], rows[-1][0]))}
+        by_id = {row[0]: row for row in rows}
+        rejected += [by_id[row[0]] + ("slot already booked",) for row in converted if row[0] not in copied]
+
+        cursor.executemany("INSERT OR REPLACE INTO appointment_rejects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rejected)
+        # Rejected rows leave the search index along with the table
+        cursor.executemany(f'''INSERT INTO appointments_fts (appointments_fts, rowid, name, phone, email)
+                              VALUES ('delete', ?, ?, {PHONE_DIGITS_SQL.format("?")}, ?)''',
+                           [row[:4] for row in rejected])
+        cursor.execute("UPDATE migration_progress SET last_id = ? WHERE name = 'normalize_appointments'", (rows[-1][0],))
+        return True
+
+    def normalize_appointments(self, cursor):
+        # Second half: copy whatever was booked since copy_appointments ran, then swap appointments_v2
+        # in. Appointments keep their ids, so the search index stays valid.
+        while self.copy_appointment_batch(cursor):
+            pass
+        cursor.execute("DROP TABLE appointments")
+        cursor.execute("ALTER TABLE appointments_v2 RENAME TO appointments")
+        cursor.execute("CREATE INDEX idx_appointments_start ON appointments (start)")
+        cursor.execute("CREATE INDEX idx_appointments_phone ON appointments (phone)")
+        self.create_search_triggers(cursor)
+        cursor.execute(f'''
+            CREATE VIEW appointment_details AS
+            SELECT a.id, a.name, a.phone, a.email, s.service_name AS service, st.name AS stylist,
+                   date(a.start * 60, 'unixepoch') AS date, {TIME_LABEL_SQL} AS time,
+                   a.start, a.duration, a.service_id, a.stylist_id
+            FROM appointments a
+            LEFT JOIN services s ON s.id = a.service_id
+            LEFT JOIN stylists st ON st.id = a.stylist_id
+        ''')
+        cursor.execute("DELETE FROM migration_progress WHERE name = 'normalize_appointments'")
+
+    def vacuum(self):
+        # Give the space of the legacy table back to the file system; needs no open transaction
+        self.db.with_retries(lambda: self.db.write_connection.execute("VACUUM"))
+
+    def create_booking_summary(self, cursor):
+        # Bookings and booked minutes per (day, stylist, service) and per (month, stylist, service), kept
+        # current by triggers so reports read summary rows instead of the whole appointment history.
+        # Revenue is bookings * the current price, the figure a join against services.price would give.
+        for table, day in SUMMARY_TABLES.items():
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    day INTEGER NOT NULL,
+                    stylist_id INTEGER NOT NULL,
+                    service_id INTEGER NOT NULL,
+                    bookings INTEGER NOT NULL,
+                    minutes INTEGER NOT NULL,
+                    PRIMARY KEY (day, stylist_id, service_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute(f'''
+                INSERT INTO {table} (day, stylist_id, service_id, bookings, minutes)
+                SELECT {day.format("start")}, stylist_id, service_id, COUNT(*), SUM(duration) FROM appointments GROUP BY 1, 2, 3
+            ''')
+
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS appointments_summary_insert AFTER INSERT ON appointments BEGIN {SUMMARY_ADD_SQL} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS appointments_summary_delete AFTER DELETE ON appointments BEGIN {SUMMARY_REMOVE_SQL} END")
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS appointments_summary_update
+                          AFTER UPDATE OF service_id, stylist_id, start, duration ON appointments BEGIN {SUMMARY_REMOVE_SQL} {SUMMARY_ADD_SQL} END''')
+
+    def create_appointment_series(self, cursor):
+        # Appointments booked together, a recurring series (every_weeks set) or one visit for several
+        # services, share a series row so they can be edited or cancelled together
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS appointment_series (
+                id INTEGER PRIMARY KEY,
+                every_weeks INTEGER
+            )
+        ''')
+        cursor.execute("ALTER TABLE appointments ADD COLUMN series_id INTEGER REFERENCES appointment_series (id)")
+        # Partial, so one-off bookings cost the index nothing
+        cursor.execute("CREATE INDEX idx_appointments_series ON appointments (series_id, start) WHERE series_id IS NOT NULL")
+        cursor.execute("DROP VIEW appointment_details")
+        cursor.execute(f'''
+            CREATE VIEW appointment_details AS
+            SELECT a.id, a.name, a.phone, a.email, s.service_name AS service, st.name AS stylist,
+                   date(a.start * 60, 'unixepoch') AS date, {TIME_LABEL_SQL} AS time,
+                   a.start, a.duration, a.service_id, a.stylist_id, a.series_id
+            FROM appointments a
+            LEFT JOIN services s ON s.id = a.service_id
+            LEFT JOIN stylists st ON st.id = a.stylist_id
+        ''')
+
+    def create_reminder_log(self, cursor):
+        # One row per reminder handled, keyed by the appointment and the start it was for, so a rescheduled
+        # appointment earns a new reminder. status is 'sent', or 'invalid' / 'refused' when the address can
+        # never be delivered to; failures worth retrying are not logged.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminders_sent (
+                appointment_id INTEGER NOT NULL,
+                start INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                sent_at INTEGER NOT NULL,
+                PRIMARY KEY (appointment_id, start)
+            ) WITHOUT ROWID
+        ''')
+
+    def create_maintenance_flags(self, cursor):
+        # Flags a maintenance job sets only inside its own write transaction, so no other connection ever
+        # sees them. While 'archiving' is set, a deleted appointment is moving to the archive rather than
+        # being cancelled, and the reports keep counting it.
+        cursor.execute("CREATE TABLE IF NOT EXISTS maintenance_flags (name TEXT PRIMARY KEY) WITHOUT ROWID")
+        cursor.execute("DROP TRIGGER appointments_summary_delete")
+        cursor.execute(f'''CREATE TRIGGER appointments_summary_delete AFTER DELETE ON appointments
+                          WHEN NOT EXISTS (SELECT 1 FROM maintenance_flags WHERE name = 'archiving') BEGIN {SUMMARY_REMOVE_SQL} END''')
+
+    def defer_import_triggers(self, cursor):
+        # While 'importing' is set, import_appointments fills the search index and the summaries itself, one
+        # statement per chunk, instead of the insert triggers doing it row by row
+        importing = "NOT EXISTS (SELECT 1 FROM maintenance_flags WHERE name = 'importing')"
+        phone = PHONE_DIGITS_SQL.format("NEW.phone")
+        cursor.execute("DROP TRIGGER appointments_fts_insert")
+        cursor.execute(f'''
+            CREATE TRIGGER appointments_fts_insert AFTER INSERT ON appointments WHEN {importing} BEGIN
+                INSERT INTO appointments_fts (rowid, name, phone, email) VALUES (NEW.id, NEW.name, {phone}, NEW.email);
+            END
+        ''')
+        cursor.execute("DROP TRIGGER appointments_summary_insert")
+        cursor.execute(f"CREATE TRIGGER appointments_summary_insert AFTER INSERT ON appointments WHEN {importing} BEGIN {SUMMARY_ADD_SQL} END")
+
+    def create_archive_tables(self, cursor):
+        # Archived appointments keep their id and the service and stylist names they were booked under, and
+        # have the same appointment_details view and prefix search index as the live table. Schema objects
+        # of an attached database can only refer to that database, hence the names stored with each row.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive.appointments (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                service TEXT,
+                stylist TEXT,
+                service_id INTEGER NOT NULL,
+                stylist_id INTEGER NOT NULL,
+                start INTEGER NOT NULL,
+                duration INTEGER NOT NULL,
+                series_id INTEGER,
+                archived_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_appointments_start ON appointments (start)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_appointments_phone ON appointments (phone)")
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS archive.appointment_details AS
+            SELECT a.id, a.name, a.phone, a.email, a.service, a.stylist,
+                   date(a.start * 60, 'unixepoch') AS date, {TIME_LABEL_SQL} AS time,
+                   a.start, a.duration, a.service_id, a.stylist_id, a.series_id
+            FROM appointments a
+        ''')
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS archive.appointments_fts USING fts5(name, phone, email, content='', prefix='2 3')")
+        phone, old_phone = PHONE_DIGITS_SQL.format("NEW.phone"), PHONE_DIGITS_SQL.format("OLD.phone")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS archive.appointments_fts_insert AFTER INSERT ON appointments BEGIN
+                INSERT INTO appointments_fts (rowid, name, phone, email) VALUES (NEW.id, NEW.name, {phone}, NEW.email);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS archive.appointments_fts_delete AFTER DELETE ON appointments BEGIN
+                INSERT INTO appointments_fts (appointments_fts, rowid, name, phone, email) VALUES ('delete', OLD.id, OLD.name, {old_phone}, OLD.email);
+            END
+        ''')
+
+    def populate_services(self, cursor):
+        # Insert default services and prices if the table is empty
+        if cursor.execute("SELECT COUNT(*) FROM services").fetchone()[0] == 0:
+            cursor.executemany("INSERT INTO services (service_name, price) VALUES (?, ?)", DEFAULT_SERVICES)
+
+    def populate_stylists(self, cursor):
+        # Insert default stylists if the table is empty
+        if cursor.execute("SELECT COUNT(*) FROM stylists").fetchone()[0] == 0:
+            cursor.executemany("INSERT INTO stylists (name, experience, specialty, email) VALUES (?, ?, ?, ?)", DEFAULT_STYLISTS)
+
+    def fetch_services(self):
+        # Retrieve services and prices from the database
+        return {row[0]: row[1] for row in self.db.fetchall("SELECT service_name, price FROM services ORDER BY id")}
+
+    def fetch_stylists(self):
+        # Retrieve stylists from the database
+        return {
+            row[0]: {"experience": row[1], "specialty": row[2], "email": row[3]}
+            for row in self.db.fetchall("SELECT name, experience, specialty, email FROM stylists ORDER BY id")
+        }
+
+    def refresh_catalog(self):
+        # Cheap staleness check; returns the catalog tables that were reloaded
+        return self.catalog.refresh()
+
+    def list_appointments(self):
+        # Every appointment as (id, name, phone, email, service, stylist, date, time)
+        return self.db.fetchall(f"SELECT {APPOINTMENT_COLUMNS} FROM appointment_details ORDER BY id")
+
+    def list_appointments_page(self, after=None, before=None, limit=PAGE_SIZE, include_archive=False):
+        # One page of appointments in (start, id) order using keyset pagination on idx_appointments_start.
+        # after/before are the listing_key of the rows bordering the page already on screen. With
+        # include_archive the archive's start index is merged in, so old pages cost the same as new ones.
+        if after is not None:
+            sql, params = appointment_query(f"SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a WHERE (start, id) > (?, ?)",
+                                            after, include_archive)
+            rows = self.db.fetchall(f"{sql} ORDER BY start, id LIMIT ?", (*params, limit))
+        elif before is not None:
+            sql, params = appointment_query(f"SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a WHERE (start, id) < (?, ?)",
+                                            before, include_archive)
+            rows = self.db.fetchall(f"{sql} ORDER BY start DESC, id DESC LIMIT ?", (*params, limit))[::-1]
+        else:
+            sql, params = appointment_query(f"SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a WHERE 1", (), include_archive)
+            rows = self.db.fetchall(f"{sql} ORDER BY start, id LIMIT ?", (*params, limit))
+        return [row[:-1] for row in rows]
+
+    def list_appointments_between(self, first_date, last_date, stylist=None, include_archive=False):
+        # Appointments from first_date through last_date (ISO dates), optionally for one stylist.
+        # A range scan of idx_appointments_start, or of idx_appointments_stylist_start with a stylist.
+        first, last = appointment_start(first_date, "00:00")[0], appointment_start(last_date, "00:00")[0] + 1440
+        if stylist is None:
+            sql, params = appointment_query(f"SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a WHERE start >= ? AND start < ?",
+                                            (first, last), include_archive)
+        else:
+            sql, params = appointment_query(f'''SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a
+                                             WHERE stylist_id = (SELECT id FROM main.stylists WHERE name = ?) AND start >= ? AND start < ?''',
+                                            (stylist, first, last), include_archive)
+        return [row[:-1] for row in self.db.fetchall(f"{sql} ORDER BY start, id", params)]
+
+    def search_appointments(self, text, after=None, before=None, limit=PAGE_SIZE, include_archive=False):
+        # One page of appointments whose name, phone or email match every word of text by prefix,
+        # in id order; after/before are the (id,) keys bordering the page already on screen
+        query = search_query(text)
+        if not query:
+            return []
+        # Ordered by f.rowid, which the FTS index yields in order, so neither arm is sorted
+        select = '''SELECT f.rowid AS id, a.name, a.phone, a.email, a.service, a.stylist, a.date, a.time
+                    FROM {schema}appointments_fts f JOIN {schema}appointment_details a ON a.id = f.rowid
+                    WHERE f.appointments_fts MATCH ? AND f.rowid '''
+        if before is not None:
+            sql, params = appointment_query(select + "< ?", (query, before[0]), include_archive)
+            return self.db.fetchall(f"{sql} ORDER BY id DESC LIMIT ?", (*params, limit))[::-1]
+        sql, params = appointment_query(select + "> ?", (query, after[0] if after is not None else 0), include_archive)
+        return self.db.fetchall(f"{sql} ORDER BY id LIMIT ?", (*params, limit))
+
+    def iter_appointments(self, batch_size=1000, include_archive=False):
+        # Stream every appointment in id order from one read snapshot, batch_size rows in memory at a time
+        sql, params = appointment_query(f"SELECT {APPOINTMENT_COLUMNS} FROM {{schema}}appointment_details a WHERE 1", (), include_archive)
+        with self.db.reader() as connection:
+            cursor = connection.execute(f"{sql} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def get_appointment(self, appointment_id):
+        return self.db.fetchone(f"SELECT {APPOINTMENT_COLUMNS} FROM appointment_details WHERE id = ?", (appointment_id,))
+
+    def find_customer_appointments(self, phone, include_archive=False):
+        # Every appointment booked under this phone number, served by idx_appointments_phone
+        sql, params = appointment_query(f"SELECT {LISTING_COLUMNS} FROM {{schema}}appointment_details a WHERE phone = ?", (phone,), include_archive)
+        return [row[:-1] for row in self.db.fetchall(f"{sql} ORDER BY start, id", params)]
+
+    def report(self, group, first_date, last_date):
+        # Bookings, revenue and utilization from first_date through last_date, grouped by a REPORT_GROUPS
+        # key. Rows are (label, bookings, revenue, utilization), utilization being booked minutes over the
+        # stylists' bookable SLOT_DAY_MINUTES, or None when grouping by service.
+        if group not in REPORT_GROUPS:
+            raise ValueError(f"Unknown report grouping {group!r}")
+        first, last = day_number(first_date), day_number(last_date)
+        if last < first:
+            raise ValueError("The report ends before it starts")
+        head, months, tail = summary_ranges(group, first, last)
+        rows = self.db.fetchall(f'''SELECT {REPORT_GROUPS[group]} AS label, SUM(d.bookings), SUM(d.bookings * s.price), SUM(d.minutes)
+                                  FROM (SELECT * FROM daily_summary WHERE day BETWEEN ? AND ?
+                                        UNION ALL SELECT * FROM monthly_summary WHERE day BETWEEN ? AND ?
+                                        UNION ALL SELECT * FROM daily_summary WHERE day BETWEEN ? AND ?) d
+                                  LEFT JOIN services s ON s.id = d.service_id
+                                  LEFT JOIN stylists st ON st.id = d.stylist_id
+                                  GROUP BY label ORDER BY label''', (*head, *months, *tail))
+
+        self.catalog.refresh()
+        if group == "service":
+            return [(label, bookings, revenue or 0, None) for label, bookings, revenue, minutes in rows]
+        if group == "stylist":
+            # Stylists without a booking in the period are the ones utilization is most about
+            booked = {row[0] for row in rows}
+            rows = sorted(rows + [(name, 0, 0, 0) for name in self.catalog.stylists if name not in booked], key=lambda row: row[0] or "")
+            capacity = dict.fromkeys((row[0] for row in rows), (last - first + 1) * SLOT_DAY_MINUTES)
+        else:
+            capacity = {}
+            for day in range(first, last + 1):
+                label = report_period(group, day)
+                capacity[label] = capacity.get(label, 0) + len(self.catalog.stylists) * SLOT_DAY_MINUTES
+        return [(label, bookings, revenue or 0, minutes / capacity[label] if capacity.get(label) else None)
+                for label, bookings, revenue, minutes in rows]
+
+    def taken_slots(self, stylist, date):
+        return self.availability.taken_slots(stylist, date)
+
+    def find_available_slots(self, service, first_date, last_date, limit=FIND_LIMIT, earliest=None):
+        # Earliest free (stylist, date, time) options for a service from first_date through last_date, at most limit
+        # of them, ordered by date, time and catalog order of the stylists qualified for the service by their specialty.
+        # Slots starting before earliest (epoch-minutes, default now) are skipped. Occupancy comes from the
+        # availability bitmaps, filled a chunk of days per stylist by one index range scan and dropped as soon as
+        # another station or process commits, so slots booked elsewhere are not offered.
+        self.catalog.refresh()
+        if service not in self.catalog.services:
+            raise ValueError(f"Unknown service {service!r}")
+        first, last = day_number(first_date), day_number(last_date)
+        if last < first:
+            raise ValueError("The search ends before it starts")
+        if last - first >= FIND_MAX_DAYS:
+            raise ValueError(f"Search at most {FIND_MAX_DAYS} days at a time")
+        if earliest is None:
+            earliest = current_start()
+        first = max(first, earliest // 1440)
+        stylists = self.catalog.qualified.get(service, [])
+
+        found = []
+        for chunk in range(first, last + 1, FIND_CHUNK_DAYS):
+            days = min(FIND_CHUNK_DAYS, last + 1 - chunk)
+            chunk_date = (EPOCH + timedelta(days=chunk)).isoformat()
+            occupancy = [(stylist, self.availability.bitmaps(stylist, chunk_date, days)) for stylist in stylists]
+            for offset in range(days):
+                date = (EPOCH + timedelta(days=chunk + offset)).isoformat()
+                for slot in TIME_SLOTS:
+                    if (chunk + offset) * 1440 + SLOT_MINUTES[slot][0] < earliest:
+                        continue
+                    for stylist, bitmaps in occupancy:
+                        if not bitmaps[offset] & SLOT_BITS[slot]:
+                            found.append((stylist, date, slot))
+                            if len(found) == limit:
+                                return found
+        return found
+
+    def check_booking(self, service, stylist, date, time):
+        # Validate a booking as entered and return its (start, duration); ValueError when any part is unknown
+        self.catalog.refresh()
+        if service not in self.catalog.services:
+            raise ValueError(f"Unknown service {service!r}")
+        if stylist not in self.catalog.stylists:
+            raise ValueError(f"Unknown stylist {stylist!r}")
+        return appointment_start(date, time)
+
+    def book_appointment(self, name, phone, email, service, stylist, date, time):
+        if not name or not phone or not email or not service or not stylist or not date or not time:
+            raise ValueError("All fields are required!")
+        start, duration = self.check_booking(service, stylist, date, time)
+        date, time = start_date_time(start)
+
+        # Reject conflicts from the in-memory occupancy bitmap before touching the table
+        if not self.availability.is_free(stylist, date, time):
+            raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+
+        def insert(cursor):
+            # Checked inside the BEGIN IMMEDIATE transaction, so no other writer can book in between
+            if cursor.execute(OVERLAP_SQL, (stylist, start, start + duration, start, None)).fetchone():
+                raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+            cursor.execute('''INSERT INTO appointments (name, phone, email, service_id, stylist_id, start, duration)
+                            VALUES (?, ?, ?, (SELECT id FROM services WHERE service_name = ?), (SELECT id FROM stylists WHERE name = ?), ?, ?)''',
+                            (name, phone, email, service, stylist, start, duration))
+            return cursor.lastrowid
+
+        try:
+            appointment_id = self.db.write(insert)
+        except SlotTakenError:
+            self.availability.invalidate(stylist, date)  # The bitmap missed a booking, e.g. from another terminal
+            raise
+        except sqlite3.IntegrityError as error:
+            if "UNIQUE" not in str(error):
+                raise ValueError(f"{service} or {stylist} is no longer offered")  # Removed from the catalog meanwhile
+            # Another terminal took the slot first; the UNIQUE index has the final say
+            self.availability.invalidate(stylist, date)
+            raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+        self.availability.reserve(stylist, date, time)
+        return appointment_id
+
+    def book_appointments(self, name, phone, email, bookings, every_weeks=None):
+        # Book several (service, stylist, date, time) for one customer, a visit for several services or the
+        # occurrences of a recurring series, as one linked series. The batch is checked against the table and
+        # itself in one query and written in one transaction; when any booking clashes nothing is booked and
+        # SlotTakenError lists the clashes. Returns the series id.
+        if not name or not phone or not email:
+            raise ValueError("All fields are required!")
+        if not bookings:
+            raise ValueError("Nothing to book")
+        staged = []
+        for line, (service, stylist, date, time) in enumerate(bookings):
+            if not service or not stylist or not date or not time:
+                raise ValueError("All fields are required!")
+            start, duration = self.check_booking(service, stylist, date, time)
+            staged.append((line, None, service, stylist, start, duration))
+        days = {(stylist, start_date_time(start)[0]) for line, appointment_id, service, stylist, start, duration in staged}
+
+        def insert(cursor):
+            self.check_batch(cursor, staged)
+            series_id = cursor.execute("INSERT INTO appointment_series (every_weeks) VALUES (?)", (every_weeks,)).lastrowid
+            cursor.executemany('''INSERT INTO appointments (name, phone, email, service_id, stylist_id, start, duration, series_id)
+                                VALUES (?, ?, ?, (SELECT id FROM services WHERE service_name = ?), (SELECT id FROM stylists WHERE name = ?), ?, ?, ?)''',
+                               [(name, phone, email, service, stylist, start, duration, series_id)
+                                for line, appointment_id, service, stylist, start, duration in staged])
+            return series_id
+
+        return self.write_batch(insert, days)
+
+    def book_series(self, name, phone, email, service, stylist, date, time, every_weeks, count=None, until=None):
+        # Recurring booking every every_weeks weeks from date, for count occurrences or through until; see book_appointments
+        dates = series_dates(date, every_weeks, count, until)
+        return self.book_appointments(name, phone, email, [(service, stylist, day, time) for day in dates], every_weeks)
+
+    def check_batch(self, cursor, staged):
+        # Raise SlotTakenError for the staged (line, id, service, stylist, start, duration) rows that overlap a booking
+        # of the same stylist, in the table or earlier in the batch. Rows being moved (id set) never clash with
+        # where they are now. One query for the whole batch, run inside the write transaction.
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS booking_staging (
+                line INTEGER PRIMARY KEY, id INTEGER, stylist_id INTEGER, start INTEGER, duration INTEGER
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS temp.idx_booking_staging_slot ON booking_staging (stylist_id, start)")
+        cursor.execute("DELETE FROM booking_staging")
+        cursor.executemany("INSERT INTO booking_staging VALUES (?, ?, (SELECT id FROM main.stylists WHERE name = ?), ?, ?)",
+                           [(line, appointment_id, stylist, start, duration) for line, appointment_id, service, stylist, start, duration in staged])
+        clashes = [line for (line,) in cursor.execute('''
+            SELECT b.line FROM booking_staging b
+            WHERE EXISTS (SELECT 1 FROM main.appointments a
+                          WHERE a.stylist_id = b.stylist_id AND a.start > b.start - 1440 AND a.start < b.start + b.duration
+                            AND a.start + a.duration > b.start AND a.id NOT IN (SELECT id FROM booking_staging WHERE id IS NOT NULL))
+               OR EXISTS (SELECT 1 FROM booking_staging c
+                          WHERE c.stylist_id = b.stylist_id AND c.line < b.line AND c.start < b.start + b.duration AND c.start + c.duration > b.start)
+            ORDER BY b.line
+        ''')]
+        if clashes:
+            conflicts = [(staged[line][3], *start_date_time(staged[line][4])) for line in clashes]
+            message = "{0} is already booked on {1} at {2}".format(*conflicts[0])
+            if len(conflicts) > 1:
+                message += f" (and {len(conflicts) - 1} more)"
+            raise SlotTakenError(message, conflicts)
+
+    def write_batch(self, write, days):
+        # Run a batch write; the availability bitmaps of the (stylist, date) days it touched are dropped either way
+        try:
+            return self.db.write(write)
+        except sqlite3.IntegrityError as error:
+            if "UNIQUE" not in str(error):
+                raise ValueError("A service or stylist is no longer offered")
+            raise SlotTakenError("One of the slots was booked meanwhile")
+        finally:
+            for stylist, date in days:
+                self.availability.invalidate(stylist, date)
+
+    def import_appointments(self, rows):
+        # Insert a chunk of (line, name, phone, email, service, stylist, date, time) rows in one transaction.
+        # Returns (line, reason) for the rows rejected because they overlap a booking of the stylist, in the table
+        # or earlier in the chunk, or because their service or stylist left the catalog after they were checked.
+        keys, staged = [], []
+        for line, name, phone, email, service, stylist, date, time in rows:
+            start, duration = appointment_start(date, time)
+            keys.append((line, (service, stylist, start, duration)))
+            staged.append((name, phone, email, start, duration, service, stylist, start, start + duration, start))
+
+        def insert(cursor):
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM appointments").fetchone()[0]
+            # executemany runs the rows in line order, so each is checked against the table and the rows accepted
+            # before it. The search index and the summaries are filled once for the whole chunk instead of by the
+            # insert triggers, which stand aside while 'importing' is set.
+            cursor.execute("INSERT INTO maintenance_flags (name) VALUES ('importing')")
+            cursor.executemany('''
+                INSERT INTO appointments (name, phone, email, service_id, stylist_id, start, duration)
+                SELECT ?, ?, ?, s.id, st.id, ?, ? FROM services s, stylists st
+                WHERE s.service_name = ? AND st.name = ?
+                  AND NOT EXISTS (SELECT 1 FROM appointments a
+                                  WHERE a.stylist_id = st.id AND a.start > ? - 1440 AND a.start < ? AND a.start + a.duration > ?)
+            ''', staged)
+            cursor.execute(f'''INSERT INTO appointments_fts (rowid, name, phone, email)
+                            SELECT id, name, {PHONE_DIGITS_SQL.format('phone')}, email FROM appointments WHERE id > ?''', (last_id,))
+            for statement in SUMMARY_ADD_BATCH_SQL:
+                cursor.execute(statement, (last_id,))
+            cursor.execute("DELETE FROM maintenance_flags WHERE name = 'importing'")
+
+            # The new rows come back in line order. A row sharing its key with the next new row was accepted
+            # unless an earlier line with the same key already claimed it; the rest were rejected.
+            inserted = iter(cursor.execute('''SELECT service, stylist, start, duration FROM appointment_details WHERE id > ?
+                                           ORDER BY id''', (last_id,)).fetchall())
+            services = {row[0] for row in cursor.execute("SELECT service_name FROM services")}
+            stylists = {row[0] for row in cursor.execute("SELECT name FROM stylists")}
+            rejected = []
+            following = next(inserted, None)
+            for line, key in keys:
+                if key == following:
+                    following = next(inserted, None)
+                elif key[0] in services and key[1] in stylists:
+                    rejected.append((line, IMPORT_OVERLAP))
+                else:
+                    rejected.append((line, IMPORT_NOT_OFFERED))
+            return rejected
+
+        # Committing moves PRAGMA data_version, so the availability bitmaps are dropped without a per-day pass
+        return self.db.write(insert)
+
+    def update_appointment(self, appointment_id, name, phone, email, service, stylist, date, time):
+        # Raises AppointmentNotFoundError if the appointment is gone, SlotTakenError if the new time is taken
+        current = self.get_appointment(appointment_id)
+        if current is None:
+            raise AppointmentNotFoundError(f"Appointment {appointment_id} no longer exists")
+        start, duration = self.check_booking(service, stylist, date, time)
+        date, time = start_date_time(start)
+        moved = (stylist, date, time) != tuple(current[5:8])
+        if moved and not self.availability.is_free(stylist, date, time):
+            raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+
+        def update(cursor):
+            if cursor.execute(OVERLAP_SQL, (stylist, start, start + duration, start, appointment_id)).fetchone():
+                raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+            cursor.execute('''UPDATE appointments SET name = ?, phone = ?, email = ?,
+                                   service_id = (SELECT id FROM services WHERE service_name = ?),
+                                   stylist_id = (SELECT id FROM stylists WHERE name = ?), start = ?, duration = ?
+                            WHERE id = ?''',
+                            (name, phone, email, service, stylist, start, duration, appointment_id))
+            if cursor.rowcount == 0:
+                raise AppointmentNotFoundError(f"Appointment {appointment_id} no longer exists")
+
+        try:
+            self.db.write(update)
+        except SlotTakenError:
+            self.availability.invalidate(stylist, date)
+            raise
+        except sqlite3.IntegrityError as error:
+            if "UNIQUE" not in str(error):
+                raise ValueError(f"{service} or {stylist} is no longer offered")
+            self.availability.invalidate(stylist, date)
+            raise SlotTakenError(f"{stylist} is already booked on {date} at {time}")
+        if moved:
+            self.availability.release(*current[5:8])
+            self.availability.reserve(stylist, date, time)
+
+    def delete_appointments(self, appointment_ids):
+        # Delete a selection in one transaction; returns the ids that were still in the live table.
+        # Archived appointments and ones already deleted are left out.
+        def delete(cursor):
+            removed = []
+            for appointment_id in appointment_ids:
+                row = cursor.execute("SELECT stylist, date, time FROM appointment_details WHERE id = ?", (appointment_id,)).fetchone()
+                if row is not None:
+                    cursor.execute("DELETE FROM appointments WHERE id = ?", (appointment_id,))
+                    removed.append((appointment_id, *row))
+            return removed
+
+        removed = self.db.write(delete)
+        for appointment_id, stylist, date, time in removed:
+            self.availability.release(stylist, date, time)
+        return [row[0] for row in removed]
+
+    def delete_appointment(self, appointment_id):
+        # True if the appointment existed
+        return bool(self.delete_appointments([appointment_id]))
+
+    def get_series(self, series_id):
+        # (series_id, every_weeks) or None; every_weeks is None for a visit booked for several services
+        return self.db.fetchone("SELECT id, every_weeks FROM appointment_series WHERE id = ?", (series_id,))
+
+    def series_of(self, appointment_id):
+        # (series_id, every_weeks, appointments left in it) for an appointment booked as part of a series, else None
+        return self.db.fetchone('''SELECT s.id, s.every_weeks, (SELECT COUNT(*) FROM appointments WHERE series_id = s.id)
+                                FROM appointments a JOIN appointment_series s ON s.id = a.series_id WHERE a.id = ?''',
+                                (appointment_id,))
+
+    def list_series(self, series_id):
+        # The appointments of a series in time order, served by idx_appointments_series
+        return self.db.fetchall(f"SELECT {APPOINTMENT_COLUMNS} FROM appointment_details WHERE series_id = ? ORDER BY start", (series_id,))
+
+    def update_series(self, appointment_id, name, phone, email, service, stylist, date, time):
+        # Apply an edit of one occurrence of a recurring series to it and every later occurrence: customer details,
+        # service, stylist and time are copied and dates move by as many days as this one did. Checked and written
+        # in one transaction like book_appointments. Returns the ids changed; a booking outside any series is
+        # updated on its own. Raises AppointmentNotFoundError like update_appointment.
+        if not name or not phone or not email or not service or not stylist or not date or not time:
+            raise ValueError("All fields are required!")
+        current = self.db.fetchone("SELECT series_id, start FROM appointments WHERE id = ?", (appointment_id,))
+        if current is None:
+            raise AppointmentNotFoundError(f"Appointment {appointment_id} no longer exists")
+        if current[0] is None:
+            self.update_appointment(appointment_id, name, phone, email, service, stylist, date, time)
+            return [appointment_id]
+        series_id, old_start = current
+        start, duration = self.check_booking(service, stylist, date, time)
+        shift, minute = start // 1440 - old_start // 1440, start % 1440
+        days = set()
+
+        def update(cursor):
+            # Moving later appointments first keeps each one off the slot the next is still holding
+            rows = cursor.execute(f'''SELECT id, start, stylist FROM appointment_details WHERE series_id = ? AND start >= ?
+                                    ORDER BY start {"DESC" if start > old_start else ""}''', (series_id, old_start)).fetchall()
+            # The edited occurrence may have been deleted, archived or moved since it was read
+            if (appointment_id, old_start) not in {(row_id, row_start) for row_id, row_start, row_stylist in rows}:
+                raise AppointmentNotFoundError(f"Appointment {appointment_id} no longer exists")
+            staged = [(line, row_id, service, stylist, (row_start // 1440 + shift) * 1440 + minute, duration)
+                      for line, (row_id, row_start, row_stylist) in enumerate(rows)]
+            days.update((row_stylist, start_date_time(row_start)[0]) for row_id, row_start, row_stylist in rows)
+            days.update((stylist, start_date_time(row[4])[0]) for row in staged)
+            self.check_batch(cursor, staged)
+            cursor.executemany('''UPDATE appointments SET name = ?, phone = ?, email = ?,
+                                       service_id = (SELECT id FROM services WHERE service_name = ?),
+                                       stylist_id = (SELECT id FROM stylists WHERE name = ?), start = ?, duration = ?
+                                WHERE id = ?''',
+                               [(name, phone, email, service, stylist, row_start, row_duration, row_id)
+                                for line, row_id, service, stylist, row_start, row_duration in staged])
+            return [row[0] for row in rows]
+
+        return self.write_batch(update, days)
+
+    def cancel_series(self, series_id, from_date=None):
+        # Delete the appointments of a series, or only those from from_date on, in one transaction; returns their ids
+        first = appointment_start(from_date, "00:00")[0] if from_date else None
+        days = set()
+
+        def delete(cursor):
+            rows = cursor.execute('''SELECT id, stylist, date FROM appointment_details WHERE series_id = ? AND start >= coalesce(?, start)''',
+                                  (series_id, first)).fetchall()
+            cursor.execute("DELETE FROM appointments WHERE series_id = ? AND start >= coalesce(?, start)", (series_id, first))
+            if not cursor.execute("SELECT 1 FROM appointments WHERE series_id = ? LIMIT 1", (series_id,)).fetchone():
+                cursor.execute("DELETE FROM appointment_series WHERE id = ?", (series_id,))
+            days.update(row[1:] for row in rows)
+            return [row[0] for row in rows]
+
+        return self.write_batch(delete, days)
+
+    def iter_due_reminders(self, first, last, batch_size=REMINDER_BATCH):
+        # Batches of (id, name, email, service, stylist, date, time, start) for appointments starting in
+        # [first, last) epoch-minutes with no reminder logged yet, in (start, id) order. Each batch is its
+        # own keyset read of idx_appointments_start, so no read snapshot is held between batches.
+        after = (first - 1, 0)
+        while True:
+            rows = self.db.fetchall('''SELECT a.id, a.name, a.email, a.service, a.stylist, a.date, a.time, a.start
+                                    FROM appointment_details a
+                                    WHERE a.start >= ? AND a.start < ? AND (a.start, a.id) > (?, ?)
+                                      AND NOT EXISTS (SELECT 1 FROM reminders_sent r WHERE r.appointment_id = a.id AND r.start = a.start)
+                                    ORDER BY a.start, a.id LIMIT ?''', (first, last, *after, batch_size))
+            if not rows:
+                return
+            yield rows
+            after = (rows[-1][7], rows[-1][0])
+
+    def record_reminders(self, handled):
+        # Log (appointment_id, start, status) rows in one short write transaction
+        def insert(cursor):
+            cursor.executemany('''INSERT OR IGNORE INTO reminders_sent (appointment_id, start, status, sent_at)
+                                VALUES (?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))''', handled)
+        self.db.write(insert)
+
+    def archive_appointments(self, before, batch_size=ARCHIVE_BATCH):
+        # Move the appointments that were over before the start of day `before` (ISO date, today at the latest)
+        # to the archive database, oldest first; returns how many moved. Each batch is copied in one short
+        # write transaction and deleted from the live table in the next, so bookings keep flowing in between
+        # and an interruption leaves rows in both databases, never in neither. The next run copies those again.
+        # Report summaries keep counting archived appointments.
+        cutoff = appointment_start(before, "00:00")[0]
+        if cutoff > current_start():
+            raise ValueError("Only appointments that are already over can be archived")
+        archived = 0
+        while True:
+            rows = self.db.write(self.copy_to_archive, cutoff, batch_size)
+            if not rows:
+                return archived
+            removed = self.write_batch(lambda cursor: self.remove_archived(cursor, [row[0] for row in rows]), {row[1:] for row in rows})
+            if not removed:
+                return archived  # Every row of the batch changed after it was copied; leave them for the next run
+            archived += removed
+
+    def stage_archive_batch(self, cursor, ids):
+        # Batch ids for set-based statements: one statement per batch, rather than per row, keeps the FTS
+        # triggers from flushing the search index to a new segment for every appointment moved
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM archive_batch")
+        cursor.executemany("INSERT INTO archive_batch (id) VALUES (?)", [(appointment_id,) for appointment_id in ids])
+
+    def copy_to_archive(self, cursor, cutoff, batch_size):
+        # Copy the next batch_size appointments over before cutoff into the archive; returns their (id, stylist, date)
+        rows = cursor.execute('''SELECT id, stylist, date FROM appointment_details WHERE start < ? AND start + duration <= ?
+                              ORDER BY start, id LIMIT ?''', (cutoff, cutoff, batch_size)).fetchall()
+        self.stage_archive_batch(cursor, [row[0] for row in rows])
+        # A copy left by an interrupted run is replaced, in case the appointment changed since
+        cursor.execute("DELETE FROM archive.appointments WHERE id IN (SELECT id FROM archive_batch)")
+        cursor.execute('''INSERT INTO archive.appointments (id, name, phone, email, service, stylist, service_id, stylist_id,
+                                                           start, duration, series_id, archived_at)
+                        SELECT id, name, phone, email, service, stylist, service_id, stylist_id, start, duration, series_id,
+                               CAST(strftime('%s', 'now') AS INTEGER)
+                        FROM main.appointment_details WHERE id IN (SELECT id FROM archive_batch) ORDER BY id''')
+        return rows
+
+    def remove_archived(self, cursor, ids):
+        # Delete the live rows whose archived copy is identical, under the 'archiving' flag so the summaries keep
+        # counting them; returns how many were deleted
+        self.stage_archive_batch(cursor, ids)
+        matches = " AND ".join(f"r.{column} IS l.{column}" for column in ARCHIVE_MATCH_COLUMNS)
+        cursor.execute("INSERT INTO maintenance_flags (name) VALUES ('archiving')")
+        cursor.execute(f'''DELETE FROM main.appointments AS l
+                         WHERE l.id IN (SELECT id FROM archive_batch)
+                           AND EXISTS (SELECT 1 FROM archive.appointments r WHERE r.id = l.id AND {matches})''')
+        removed = cursor.rowcount
+        cursor.execute("DELETE FROM maintenance_flags WHERE name = 'archiving'")
+        return removed
+
+    def backup(self, path, pages=BACKUP_PAGES, pause=BACKUP_PAUSE, progress=None):
+        # Online snapshot of the database to path and of its archive next to it, as archive_path_for(path) names
+        # it, while bookings carry on; see ConnectionManager.backup
+        self.db.backup({"main": path, "archive": archive_path_for(path)}, pages, pause, progress)
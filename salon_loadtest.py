@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as calendar_date, timedelta
+
+from salon_api import MAX_SOONEST, BookingAPI, serve
+from salon_availability import TIME_SLOTS
+from salon_benchmark import summarize
+from salon_engine import DEFAULT_SERVICES, DEFAULT_STYLISTS, BookingEngine
+
+# Load test for salon_api against localhost.
+#
+#   python salon_loadtest.py --clients 500 --requests 20
+#
+# Starts the API on a scratch database (or targets --port of a running one),
+# then opens --clients keep-alive connections at once:
+#
+#   contention  every client tries to book the same few slots; exactly one
+#               booking per slot may succeed, the rest must get 409
+#   mixed       each client runs --requests requests: mostly free-slot
+#               queries, some bookings of random slots and cancellations
+#   shared      a front-desk station in a second process books and then
+#               cancels a slot the API has already read; /slots,
+#               /slots/soonest and POST /appointments must see both at once
+#
+# Latency percentiles and throughput are printed as JSON, and the run fails
+# if any slot ended up booked twice or the API missed the front desk's
+# changes. Against --port the shared phase needs that server's --db.
+
+CLIENTS = 200
+REQUESTS = 20
+CONTENDED_SLOTS = 7
+FIRST_DAY = calendar_date.today() + timedelta(days=1)
+DAYS = 60
+
+
+class Client:
+    # One keep-alive HTTP/1.1 connection
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b""
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+def booking(number, stylist, date, slot):
+    return {"name": f"Load Client {number}", "phone": f"09{number:09d}", "email": f"load{number}@example.com",
+            "service": DEFAULT_SERVICES[number % len(DEFAULT_SERVICES)][0], "stylist": stylist, "date": date, "time": slot}
+
+
+def latency_summary(latencies):
+    # Per-request percentiles; throughput is reported per phase, since requests overlap
+    summary = summarize(latencies)
+    del summary["total_s"], summary["ops_per_s"]
+    return summary
+
+
+async def timed(latencies, statuses, coroutine):
+    started = time.perf_counter()
+    status, data = await coroutine
+    latencies.append(time.perf_counter() - started)
+    statuses[status] = statuses.get(status, 0) + 1
+    return status, data
+
+
+async def contention(clients):
+    # Every client books one of CONTENDED_SLOTS slots of the same stylist and day at the same moment
+    stylist, date = DEFAULT_STYLISTS[0][0], FIRST_DAY.isoformat()
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        timed(latencies, statuses, client.request("POST", "/appointments", booking(number, stylist, date, TIME_SLOTS[number % CONTENDED_SLOTS])))
+        for number, client in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    winners = {}
+    for status, data in results:
+        if status == 201:
+            winners[data["time"]] = winners.get(data["time"], 0) + 1
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "statuses": statuses,
+        "latency": latency_summary(latencies),
+        "double_bookings": sum(count - 1 for count in winners.values() if count > 1),
+        "slots_booked": len(winners),
+        "slots_contended": min(CONTENDED_SLOTS, len(clients)),
+    }
+
+
+async def mixed(clients, requests, seed):
+    latencies, statuses = [], {}
+    booked = {}  # (stylist, date, time) -> number of 201s
+
+    async def run(number, client):
+        rng = random.Random(seed + number)
+        mine = []
+        for _ in range(requests):
+            stylist = rng.choice(DEFAULT_STYLISTS)[0]
+            date = (FIRST_DAY + timedelta(days=1 + rng.randrange(DAYS))).isoformat()
+            roll = rng.random()
+            if roll < 0.7:
+                await timed(latencies, statuses, client.request("GET", f"/slots?stylist={stylist.replace(' ', '%20')}&date={date}"))
+            elif roll < 0.9 or not mine:
+                status, data = await timed(latencies, statuses, client.request("POST", "/appointments", booking(number, stylist, date, rng.choice(TIME_SLOTS))))
+                if status == 201:
+                    key = (data["stylist"], data["date"], data["time"])
+                    booked[key] = booked.get(key, 0) + 1
+                    mine.append((data["id"], key))
+            else:
+                appointment_id, key = mine.pop(rng.randrange(len(mine)))
+                status, data = await timed(latencies, statuses, client.request("DELETE", f"/appointments/{appointment_id}"))
+                if status == 204:
+                    booked[key] -= 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(number, client) for number, client in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "statuses": statuses,
+        "latency": latency_summary(latencies),
+        "double_bookings": sum(count - 1 for count in booked.values() if count > 1),
+    }
+
+
+def front_desk(db_path, action, *args):
+    # One engine call from a process of its own, like a front-desk station sharing the database file
+    engine = BookingEngine(db_path)
+    try:
+        return getattr(engine, action)(*args)
+    finally:
+        engine.close()
+
+
+async def shared(client, db_path):
+    # The API reads a day, then another process books and cancels one of its slots behind its back
+    stylist, date, slot = DEFAULT_STYLISTS[0][0], (FIRST_DAY + timedelta(days=DAYS + 2)).isoformat(), TIME_SLOTS[0]
+    service = DEFAULT_SERVICES[0][0]
+    slots_path = f"/slots?stylist={stylist.replace(' ', '%20')}&date={date}"
+    soonest_path = f"/slots/soonest?service={service.replace(' ', '%20')}&from={date}&to={date}&limit={MAX_SOONEST}"
+    offer = {"stylist": stylist, "date": date, "time": slot}
+    failures = []
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as station:
+        async def desk(action, *args):
+            return await loop.run_in_executor(station, front_desk, db_path, action, *args)
+
+        await client.request("GET", slots_path)
+        await client.request("GET", soonest_path)
+        appointment_id = await desk("book_appointment", *booking(0, stylist, date, slot).values())
+        status, data = await client.request("GET", slots_path)
+        if slot not in data["taken"]:
+            failures.append("/slots shows a slot booked at the front desk as free")
+        status, data = await client.request("GET", soonest_path)
+        if offer in data:
+            failures.append("/slots/soonest offers a slot booked at the front desk")
+        status, data = await client.request("POST", "/appointments", booking(1, stylist, date, slot))
+        if status != 409:
+            failures.append(f"booking a slot taken at the front desk answered {status}")
+
+        await desk("delete_appointment", appointment_id)
+        status, data = await client.request("GET", slots_path)
+        if slot in data["taken"]:
+            failures.append("/slots shows a slot cancelled at the front desk as taken")
+        status, data = await client.request("POST", "/appointments", booking(1, stylist, date, slot))
+        if status != 201:
+            failures.append(f"booking a slot cancelled at the front desk answered {status}")
+    return {"failures": failures}
+
+
+async def load_test(host, port, client_count, requests, seed, db_path=None):
+    clients = [Client(host, port) for _ in range(client_count)]
+    try:
+        report = {"clients": client_count, "requests_per_client": requests}
+        report["contention"] = await contention(clients)
+        report["mixed"] = await mixed(clients, requests, seed)
+        if db_path is not None:
+            report["shared"] = await shared(clients[0], db_path)
+        return report
+    finally:
+        await asyncio.gather(*(client.close() for client in clients))
+
+
+def start_server(db_path, workers):
+    # Run the API on an ephemeral localhost port in a background thread; returns (port, stop)
+    engine = BookingEngine(db_path)
+    api = BookingAPI(engine, workers)
+    loop = asyncio.new_event_loop()
+    listening = threading.Event()
+    ports = []
+
+    def ready(server):
+        ports.append(server.sockets[0].getsockname()[1])
+        listening.set()
+
+    task = loop.create_task(serve(api, "127.0.0.1", 0, ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    listening.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+        api.close()
+        engine.close()
+    return ports[0], stop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the salon JSON API on localhost.")
+    parser.add_argument("--clients", type=int, default=CLIENTS, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per client in the mixed phase")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, help="test an API already running on this port instead of starting one")
+    parser.add_argument("--db", help="database file of the API under --port, for the shared phase")
+    parser.add_argument("--workers", type=int, default=8, help="API worker threads when starting the server here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.port:
+            port, stop, db_path = args.port, None, args.db
+        else:
+            db_path = os.path.join(scratch, "loadtest.db")
+            port, stop = start_server(db_path, args.workers)
+        try:
+            report = asyncio.run(load_test("127.0.0.1", port, args.clients, args.requests, args.seed, db_path))
+        finally:
+            if stop is not None:
+                stop()
+
+    print(json.dumps(report, indent=2))
+    if report["contention"]["double_bookings"] or report["mixed"]["double_bookings"]:
+        raise SystemExit("Double booking detected")
+    if report.get("shared", {}).get("failures"):
+        raise SystemExit("The API missed changes made by another process: " + "; ".join(report["shared"]["failures"]))
+
+
+if __name__ == "__main__":
+    main()
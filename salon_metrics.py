@@ -0,0 +1,256 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Opt-in profiling of the booking system. Start the app with
+#
+#   SALON_METRICS=salon_metrics.json python SalonAppointmentSystem.py
+#
+# and every SQL statement, engine call and screen build is timed into a
+# latency histogram per operation. Statements slower than SLOW_QUERY_MS are
+# kept as samples with their literals redacted and only the number of bind
+# parameters recorded. The admin Diagnostics view shows the percentiles and
+# the whole snapshot is written to the metrics file as JSON.
+#
+# Without SALON_METRICS nothing is wrapped and nothing is recorded.
+
+METRICS_ENV = "SALON_METRICS"
+SLOW_QUERY_MS = 50
+SLOW_SAMPLES = 100  # Most recent slow statements kept
+
+# Histogram buckets grow by 10%, so reported percentiles are within 10% of the true latency
+BUCKET_BASE = 1e-6  # seconds
+BUCKET_GROWTH = 1.1
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def redact(sql):
+    # Statement text with literals replaced by ?, whitespace collapsed
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    return " ".join(sql.split())
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}  # bucket index -> count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def add(self, seconds, rows=None):
+        index = math.ceil(math.log(max(seconds, BUCKET_BASE) / BUCKET_BASE, BUCKET_GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples, in seconds
+        needed = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= needed:
+                return min(BUCKET_BASE * BUCKET_GROWTH ** index, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class Metrics:
+    def __init__(self, path=None, slow_query_ms=SLOW_QUERY_MS, slow_samples=SLOW_SAMPLES):
+        self.path = path
+        self.slow_seconds = slow_query_ms / 1000
+        self.histograms = {}  # operation -> Histogram
+        self.slow_queries = deque(maxlen=slow_samples)
+        self.lock = threading.Lock()  # Recorded from the Tk thread, the database worker and the catalog cache
+        self.started = time.time()
+
+    @classmethod
+    def from_environment(cls):
+        # Metrics writing to $SALON_METRICS, or None when profiling is off
+        path = os.environ.get(METRICS_ENV)
+        return cls(path) if path else None
+
+    def record(self, operation, seconds, rows=None, sql=None, parameters=0):
+        with self.lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.add(seconds, rows)
+            if sql is not None and seconds >= self.slow_seconds:
+                self.slow_queries.append({
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "ms": round(seconds * 1000, 3),
+                    "rows": rows,
+                    "sql": redact(sql),
+                    "parameters": parameters,  # How many were bound, never their values
+                })
+
+    @contextmanager
+    def timer(self, operation):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, time.perf_counter() - started)
+
+    def summary(self):
+        # [(operation, histogram summary)], most total time first
+        with self.lock:
+            rows = [(operation, histogram.summary()) for operation, histogram in self.histograms.items()]
+        return sorted(rows, key=lambda row: row[1]["total_ms"], reverse=True)
+
+    def snapshot(self):
+        summary = self.summary()
+        with self.lock:
+            slow_queries = list(self.slow_queries)
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "written": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "operations": dict(summary),
+            "slow_queries": slow_queries,
+        }
+
+    def save(self):
+        # Replace the metrics file with the current snapshot
+        if not self.path:
+            return
+        partial = self.path + ".tmp"
+        with open(partial, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+        os.replace(partial, self.path)
+
+
+def profiled(operation):
+    # Method decorator: time calls into self.metrics when profiling is on
+    def decorate(method):
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return method(self, *args, **kwargs)
+            with self.metrics.timer(operation):
+                return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        return wrapper
+    return decorate
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    # Times each statement from execute through the last fetch and counts the rows it produced
+    pending = None  # [sql, parameter count, seconds so far, rows so far]
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self.pending = [sql, len(parameters), time.perf_counter() - started, 0]
+            if self.description is None:  # Not a query: nothing left to fetch
+                self.finish(self.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        bound = [0]
+
+        def counted():
+            for parameters in seq_of_parameters:
+                bound[0] += len(parameters)
+                yield parameters
+
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, counted())
+        finally:
+            self.pending = [sql, bound[0], time.perf_counter() - started, 0]
+            self.finish(self.rowcount)
+        return self
+
+    def fetched(self, started, rows, done):
+        if self.pending is not None:
+            self.pending[2] += time.perf_counter() - started
+            self.pending[3] += rows
+            if done:
+                self.finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(started, row is not None, True)  # Single-row lookups never come back for more
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self.fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.fetched(started, 0, True)
+            raise
+        self.fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        self.finish()
+
+    def finish(self, rows=None):
+        if self.pending is None:
+            return
+        sql, parameters, seconds, fetched = self.pending
+        self.pending = None
+        if rows is None or rows < 0:  # rowcount is -1 for statements that change nothing
+            rows = fetched
+        statement = redact(sql)
+        self.connection.metrics.record("sql: " + statement[:120], seconds, rows, sql, parameters)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # sqlite3.connect(factory=ProfiledConnection); the caller sets .metrics before use
+    metrics = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfiledCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import os
+import re
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.header import Header
+from email.utils import formatdate, make_msgid, parseaddr
+from string import Template
+
+from salon_availability import appointment_start, current_start
+from salon_engine import DB_PATH, REMINDER_BATCH, BookingEngine
+from salon_metrics import Metrics
+
+# Email reminders for upcoming appointments.
+#
+#   python salon_reminders.py send --hours 24 --smtp-host mail.example.com
+#   python salon_reminders.py send --date 2025-03-01 --smtp-port 8025
+#   python salon_reminders.py sink --port 8025
+#
+# send reads the appointments starting in the window in keyset batches of
+# the start index, renders each reminder from a template and hands it to a
+# bounded pool of workers, each keeping one SMTP connection open. Every
+# reminder handled is logged in reminders_sent a few dozen at a time in
+# short write transactions, never while a message is on the wire, so a
+# rerun skips what was already sent and an interrupted run picks up where
+# it stopped. sink is a local stand-in SMTP server that accepts and counts
+# messages, for trying the job out without a real mail server.
+
+SMTP_HOST = "localhost"
+SMTP_PORT = 25
+SMTP_TIMEOUT = 30  # seconds
+SMTP_USER_ENV = "SALON_SMTP_USER"
+SMTP_PASSWORD_ENV = "SALON_SMTP_PASSWORD"
+SENDER = "Salon <no-reply@salon.example.com>"
+WORKERS = 8
+HOURS_AHEAD = 24
+LOG_EVERY = 50  # Reminders logged per write transaction
+
+# A template is a Subject: line, a blank line and the body, with $name, $service, $stylist, $date and $time
+DEFAULT_TEMPLATE = """Subject: Reminder: your $service appointment on $date at $time
+
+Hi $name,
+
+This is a reminder of your $service appointment with $stylist on $date at $time.
+
+If you cannot make it, please call us so we can offer the slot to another client.
+
+See you soon!
+"""
+TEMPLATE_FIELDS = ("name", "service", "stylist", "date", "time")
+
+# One plain address: reminders are not sent to blanks, typos without an @ or lists
+ADDRESS = re.compile(r"[^@\s,;<>\"]+@[^@\s,;<>\"]+\.[^@\s,;<>\"]+")
+
+
+def load_template(path=None):
+    # (subject, body) Templates from a file, or the default; ValueError when malformed
+    if path is None:
+        text = DEFAULT_TEMPLATE
+    else:
+        with open(path, encoding="utf-8") as handle:
+            text = handle.read()
+    header, _, body = text.replace("\r\n", "\n").partition("\n\n")
+    if not header.startswith("Subject:") or "\n" in header:
+        raise ValueError("A reminder template starts with a single Subject: line followed by a blank line")
+    subject, body = Template(header[len("Subject:"):].strip()), Template(body)
+    try:
+        # Unknown placeholders fail here, not on the first send
+        sample = dict.fromkeys(TEMPLATE_FIELDS, "")
+        subject.substitute(sample)
+        body.substitute(sample)
+    except (KeyError, ValueError) as error:
+        raise ValueError(f"Bad placeholder in reminder template: {error}")
+    return subject, body
+
+
+def valid_address(email):
+    return bool(email) and ADDRESS.fullmatch(email) is not None
+
+
+def render(template, sender, row):
+    # Message bytes for an iter_due_reminders row. Written out as text: building an EmailMessage costs more
+    # CPU than the SMTP exchange itself, and that CPU serializes the sending threads.
+    appointment_id, name, email, service, stylist, date, time, start = row
+    fields = {"name": name, "service": service, "stylist": stylist, "date": date, "time": time}
+    fields = {key: " ".join(str(value or "").split()) for key, value in fields.items()}  # No line breaks into the headers
+    subject, body = template
+    subject = subject.substitute(fields)
+    if not subject.isascii():
+        subject = Header(subject, "utf-8").encode()
+    text = body.substitute(fields)
+    headers = [
+        f"From: {sender}",
+        f"To: {email}",
+        f"Subject: {subject}",
+        f"Date: {formatdate(localtime=True)}",
+        f"Message-ID: {make_msgid(f'reminder.{appointment_id}.{start}', domain=sender.rpartition('@')[2].rstrip('>') or None)}",
+        "MIME-Version: 1.0",
+        'Content-Type: text/plain; charset="utf-8"',
+        "Content-Transfer-Encoding: " + ("7bit" if text.isascii() else "8bit"),
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n" + text.replace("\r\n", "\n").replace("\n", "\r\n")).encode("utf-8")
+
+
+def delivery_status(error):
+    # Log status for a finished send: 'sent', 'refused' for permanent rejections, None to retry on a later run
+    if error is None:
+        return "sent"
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return "refused"
+    if isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600:
+        return "refused"
+    return None
+
+
+class SMTPTransport:
+    # One SMTP connection per worker thread, opened on first use and reopened after the server drops it
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, starttls=False, user=None, password=None, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        smtp = getattr(self.local, "smtp", None)
+        if smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+            self.local.smtp = smtp
+            with self.lock:
+                self.connections.append(smtp)
+        return smtp
+
+    def send(self, sender, recipient, message):
+        try:
+            self.connection().sendmail(sender, [recipient], message)
+        except smtplib.SMTPServerDisconnected:
+            # Servers close idle connections; try once more on a fresh one
+            self.local.smtp = None
+            self.connection().sendmail(sender, [recipient], message)
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for smtp in connections:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+def send_reminders(engine, transport, template, first, last, sender=SENDER, workers=WORKERS, batch_size=REMINDER_BATCH,
+                   metrics=None, report=None):
+    # Send a reminder for every appointment starting in [first, last) epoch-minutes without one logged yet.
+    # Returns counts of the reminders sent, skipped as invalid or refused, and failed (retried next run).
+    # report(row, error) is called for each failure.
+    counts = dict.fromkeys(("sent", "invalid", "refused", "failed"), 0)
+    handled = []
+    envelope_sender = parseaddr(sender)[1]
+
+    def deliver(row):
+        started = time.perf_counter()
+        transport.send(envelope_sender, row[2], render(template, sender, row))
+        if metrics is not None:
+            metrics.record("reminders: send", time.perf_counter() - started)
+
+    def log(status, row):
+        counts[status] += 1
+        handled.append((row[0], row[7], status))
+        if len(handled) >= LOG_EVERY:
+            engine.record_reminders(handled)
+            handled.clear()
+
+    def finished(future, row):
+        status = delivery_status(future.exception())
+        if status is None:
+            counts["failed"] += 1
+            if report is not None:
+                report(row, future.exception())
+        else:
+            log(status, row)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="salon-reminders")
+    futures = {}  # In flight -> row
+    try:
+        for batch in engine.iter_due_reminders(first, last, batch_size):
+            for row in batch:
+                if not valid_address(row[2]):
+                    log("invalid", row)
+                else:
+                    futures[executor.submit(deliver, row)] = row
+            for future in as_completed(list(futures)):
+                finished(future, futures.pop(future))
+    finally:
+        # After an interruption, drop the sends not started yet and log the ones that went out meanwhile
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for future, row in futures.items():
+            if not future.cancelled():
+                finished(future, row)
+        if handled:
+            engine.record_reminders(handled)
+    return counts
+
+
+class SMTPSink:
+    # Minimal SMTP server accepting every message, as a local stand-in for a mail server.
+    # Messages are counted and, with an outbox directory, written there as .eml files.
+    def __init__(self, outbox=None):
+        self.outbox = outbox
+        self.received = 0
+
+    async def handle(self, reader, writer):
+        writer.write(b"220 salon-sink ESMTP\r\n")
+        try:
+            while True:
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line[:4].upper()
+                if command in (b"HELO", b"EHLO"):
+                    writer.write(b"250 salon-sink\r\n")
+                elif command == b"DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    data = []
+                    while True:
+                        line = await reader.readline()
+                        if line in (b".\r\n", b".\n", b""):
+                            break
+                        data.append(line[1:] if line.startswith(b"..") else line)
+                    self.received += 1
+                    if self.outbox:
+                        with open(os.path.join(self.outbox, f"{self.received:06d}.eml"), "wb") as handle:
+                            handle.writelines(data)
+                    writer.write(b"250 OK\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                elif command in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                    writer.write(b"250 OK\r\n")
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, ready=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Email reminders for upcoming salon appointments.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    send = commands.add_parser("send", help="send the reminders due in a window")
+    send.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    send.add_argument("--hours", type=float, default=HOURS_AHEAD, help="remind appointments starting within this many hours from now")
+    send.add_argument("--date", help="remind every appointment on this date instead")
+    send.add_argument("--template", help="template file: a Subject: line, a blank line and the body")
+    send.add_argument("--sender", default=SENDER)
+    send.add_argument("--smtp-host", default=SMTP_HOST)
+    send.add_argument("--smtp-port", type=int, default=SMTP_PORT)
+    send.add_argument("--starttls", action="store_true")
+    send.add_argument("--workers", type=int, default=WORKERS, help="concurrent SMTP connections")
+    send.add_argument("--batch-size", type=int, default=REMINDER_BATCH, help="appointments read per query")
+    sink = commands.add_parser("sink", help="run a local SMTP server that accepts and counts messages")
+    sink.add_argument("--host", default="127.0.0.1")
+    sink.add_argument("--port", type=int, default=8025)
+    sink.add_argument("--outbox", help="also write each message into this directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "sink":
+        server = SMTPSink(args.outbox)
+        try:
+            asyncio.run(server.serve(args.host, args.port, lambda listening: print(f"Accepting mail on {args.host}:{args.port}", file=sys.stderr)))
+        except KeyboardInterrupt:
+            pass
+        print(f"Received {server.received} messages")
+        return
+
+    try:
+        template = load_template(args.template)
+        if args.date:
+            first = appointment_start(args.date, "00:00")[0]
+            last = first + 1440
+        else:
+            first = current_start()
+            last = first + round(args.hours * 60)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    metrics = Metrics.from_environment()
+    engine = BookingEngine(args.db, metrics=metrics)
+    transport = SMTPTransport(args.smtp_host, args.smtp_port, args.starttls, os.environ.get(SMTP_USER_ENV), os.environ.get(SMTP_PASSWORD_ENV))
+    started = time.perf_counter()
+
+    def report(row, error):
+        print(f"appointment {row[0]} ({row[2]}): {error!r}", file=sys.stderr)
+    try:
+        counts = send_reminders(engine, transport, template, first, last, args.sender, args.workers, args.batch_size, metrics, report)
+    except KeyboardInterrupt:
+        raise SystemExit("Interrupted; the reminders sent so far are logged, run again to send the rest")
+    finally:
+        transport.close()
+        engine.close()
+        if metrics is not None:
+            metrics.save()
+    elapsed = time.perf_counter() - started
+    print(f"Sent {counts['sent']} reminders in {elapsed:.2f}s ({counts['invalid']} invalid addresses, "
+          f"{counts['refused']} refused, {counts['failed']} failed and left for the next run)")
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from salon_availability import parse_date, parse_time
+from salon_engine import APPOINTMENT_FIELDS, DB_PATH, IMPORT_OVERLAP, BookingEngine
+from salon_metrics import Metrics
+
+# Bulk import and export of appointments as CSV or JSON Lines.
+#
+#   python salon_transfer.py import bookings.csv
+#   python salon_transfer.py export nightly.jsonl
+#
+# Both directions stream: import reads the file through a generator and
+# writes one transaction per chunk, export walks a single cursor with
+# fetchmany, so memory stays flat however large the file is.
+
+CHUNK_SIZE = 5000
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def read_records(path, fmt):
+    # Yield (line, record) pairs, record being a dict keyed by APPOINTMENT_FIELDS
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            for line, record in enumerate(csv.DictReader(handle), start=2):  # Line 1 is the header
+                yield line, record
+        else:
+            for line, text in enumerate(handle, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except json.JSONDecodeError as error:
+                    yield line, {"__error__": f"invalid JSON: {error.msg}"}
+
+
+def validate_records(records, services, stylists, rejects):
+    # Yield import rows for valid records; report invalid ones through rejects(line, reason)
+    for line, record in records:
+        if not isinstance(record, dict):
+            rejects(line, "not an object")
+            continue
+        if "__error__" in record:
+            rejects(line, record["__error__"])
+            continue
+
+        values = [str(record.get(field) or "").strip() for field in APPOINTMENT_FIELDS]
+        name, phone, email, service, stylist, date, slot = values
+        missing = [field for field, value in zip(APPOINTMENT_FIELDS, values) if not value]
+        if missing:
+            rejects(line, "missing " + ", ".join(missing))
+            continue
+        try:
+            parse_date(date)
+        except ValueError:
+            rejects(line, f"invalid date {date!r}")
+            continue
+        try:
+            parse_time(slot)
+        except ValueError:
+            rejects(line, f"invalid time {slot!r}")
+            continue
+        if service not in services:
+            rejects(line, f"unknown service {service!r}")
+        elif stylist not in stylists:
+            rejects(line, f"unknown stylist {stylist!r}")
+        else:
+            yield (line, name, phone, email, service, stylist, date, slot)
+
+
+def import_file(engine, path, fmt=None, chunk_size=CHUNK_SIZE, report=None):
+    # Import a CSV/JSONL file in chunked transactions; returns (imported, conflicts, invalid)
+    report = report or (lambda line, reason: None)
+    counts = {"invalid": 0}
+
+    def rejects(line, reason):
+        counts["invalid"] += 1
+        report(line, reason)
+
+    rows = validate_records(read_records(path, detect_format(path, fmt)), engine.catalog.services, engine.catalog.stylists, rejects)
+    imported = conflicts = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        rejected = engine.import_appointments(chunk)
+        for line, reason in rejected:
+            if reason == IMPORT_OVERLAP:
+                conflicts += 1
+                report(line, reason)
+            else:
+                rejects(line, reason)
+        imported += len(chunk) - len(rejected)
+    return imported, conflicts, counts["invalid"]
+
+
+def export_file(engine, path, fmt=None, include_archive=False):
+    # Stream every appointment, archived ones too if asked, to a CSV/JSONL file; returns the number of rows written
+    fmt = detect_format(path, fmt)
+    fields = ("id",) + APPOINTMENT_FIELDS
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            writer = csv.writer(handle)
+            writer.writerow(fields)
+            for row in engine.iter_appointments(include_archive=include_archive):
+                writer.writerow(row)
+                written += 1
+        else:
+            for row in engine.iter_appointments(include_archive=include_archive):
+                handle.write(json.dumps(dict(zip(fields, row))) + "\n")
+                written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import or export salon appointments.")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="CSV or JSONL file (format taken from the extension unless --format is given)")
+    parser.add_argument("--format", choices=("csv", "jsonl"))
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per import transaction")
+    parser.add_argument("--include-archive", action="store_true", help="export archived appointments too")
+    args = parser.parse_args(argv)
+
+    metrics = Metrics.from_environment()
+    engine = BookingEngine(args.db, metrics=metrics)
+    started = time.perf_counter()
+    try:
+        if args.command == "import":
+            def report(line, reason):
+                print(f"line {line}: {reason}", file=sys.stderr)
+            imported, conflicts, invalid = import_file(engine, args.path, args.format, args.chunk_size, report)
+            elapsed = time.perf_counter() - started
+            print(f"Imported {imported} appointments ({conflicts} conflicts, {invalid} invalid) in {elapsed:.2f}s")
+        else:
+            written = export_file(engine, args.path, args.format, args.include_archive)
+            elapsed = time.perf_counter() - started
+            print(f"Exported {written} appointments in {elapsed:.2f}s")
+    finally:
+        engine.close()
+        if metrics is not None:
+            metrics.save()
+
+
+if __name__ == "__main__":
+    main()
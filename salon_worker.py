@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Runs every BookingEngine call on one dedicated thread that owns its own
+# SQLite connection. The Tk side submits requests and picks up finished
+# results from dispatch_responses(), which it polls with root.after, so the
+# mainloop never waits on the database.
+
+
+class DatabaseWorker(threading.Thread):
+    def __init__(self, engine_factory, on_error=None):
+        super().__init__(name="salon-db-worker", daemon=True)
+        self.engine_factory = engine_factory
+        self.on_error = on_error
+        self.requests = queue.Queue()
+        self.responses = queue.Queue()
+        self.ready = threading.Event()
+        self.startup_error = None
+        self.engine = None
+
+    def run(self):
+        # The connection must be created on the thread that uses it
+        try:
+            self.engine = self.engine_factory()
+        except Exception as error:
+            self.startup_error = error
+            return
+        finally:
+            self.ready.set()
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            future, method, args, kwargs, callback, errback = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                result = getattr(self.engine, method)(*args, **kwargs)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            if self.engine.metrics is not None:
+                self.engine.metrics.record("engine: " + method, time.perf_counter() - started)
+            if callback is not None or errback is not None:
+                self.responses.put((future, callback, errback))
+        self.engine.close()
+
+    def start_engine(self):
+        # Start the thread and wait for the engine, so startup failures surface to the caller
+        self.start()
+        self.ready.wait()
+        if self.startup_error is not None:
+            raise self.startup_error
+
+    def submit(self, method, *args, callback=None, errback=None, **kwargs):
+        # Queue engine.<method>(*args, **kwargs); callback/errback run later on the thread calling dispatch_responses
+        future = Future()
+        self.requests.put((future, method, args, kwargs, callback, errback or self.on_error))
+        return future
+
+    def dispatch_responses(self):
+        # Run the callbacks of every finished request; called from the Tk thread
+        while True:
+            try:
+                future, callback, errback = self.responses.get_nowait()
+            except queue.Empty:
+                return
+            error = future.exception()
+            if error is None:
+                if callback is not None:
+                    callback(future.result())
+            elif errback is not None:
+                errback(error)
+
+    def stop(self):
+        if self.is_alive():
+            self.requests.put(None)
+            self.join()